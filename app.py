@@ -12,12 +12,34 @@ from datetime import datetime, timedelta
 import sys
 import os
 import sqlite3
+import hashlib
+import json
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import re
+import tempfile
+from pathlib import Path
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import zipfile
+import zlib
+from urllib.parse import urlencode
+from upload_parsing import parse_spreadsheet
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transactions.db')
+DB_PATH = os.environ.get('TRANSACTIONS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transactions.db'))
+# Seconds a connection waits for another worker's write lock before giving up
+SQLITE_BUSY_TIMEOUT = 30
+# Snapshot mode: every committed write publishes a read-only copy of the database and
+# dashboard reads go to the newest copy, so they never contend with an import
+READ_SNAPSHOTS = os.environ.get('READ_SNAPSHOTS', '').lower() in ('1', 'true', 'yes')
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', DB_PATH + '-snapshots')
+# Snapshots kept besides the newest, so readers that just opened the previous one can finish
+SNAPSHOT_KEEP = 2
+SNAPSHOT_MMAP_SIZE = 256 * 1024 * 1024
 
 # Theme options for light and dark mode
 THEMES = {
@@ -39,86 +61,1012 @@ app = dash.Dash(__name__, external_stylesheets=[get_theme(), "https://cdn.jsdeli
 # Configure for production deployment
 app.config.suppress_callback_exceptions = True
 
-# Initialize DB if not exists
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS transactions (
+TRANSACTION_COLUMNS = ['transation_type', 'amount', 'type', 'description', 'date', 'title']
+# Low-cardinality labels are stored as integer ids into a lookup_<column> table
+CATEGORICAL_COLUMNS = ['transation_type', 'type', 'title']
+STORED_COLUMNS = [f'{col}_id' if col in CATEGORICAL_COLUMNS else col for col in TRANSACTION_COLUMNS]
+# Columns fetch_transactions can project, and the dtype each comes back as
+FETCH_COLUMNS = TRANSACTION_COLUMNS + ['anomaly_score']
+FLOAT_COLUMNS = ['amount', 'anomaly_score']
+INSERT_TRANSACTION_SQL = f'INSERT INTO transactions ({", ".join(STORED_COLUMNS)}, fingerprint, anomaly_score, recurrence_key) VALUES (?,?,?,?,?,?,?,?,?)'
+
+# Bump when the on-disk schema changes; migrations in init_db bring older files up to date
+SCHEMA_VERSION = 9
+MIGRATION_BATCH_SIZE = 5000
+# Keeps IN (...) lookups well under SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+# Rows per batch when streaming exports out of SQLite
+EXPORT_CHUNK_SIZE = 50000
+# Searches count matches only up to this many, and rank by relevance only below it:
+# bm25 over a quarter-million matches costs ~400 ms, newest-first costs a few
+SEARCH_RANK_LIMIT = 1000
+
+# A transaction is flagged when its amount sits this many spreads away from the
+# earlier transactions with the same transation_type and title
+ANOMALY_THRESHOLD = 3.5
+# Groups need some history before their spread means anything
+ANOMALY_MIN_HISTORY = 5
+# Spread floor as a fraction of the group mean, so perfectly steady payments
+# (rent, salary) aren't flagged for a one-rupee change
+ANOMALY_MIN_SPREAD = 0.05
+
+# Amounts within this relative band of each other can belong to the same schedule
+RECURRING_AMOUNT_TOLERANCE = 0.05
+RECURRING_MIN_OCCURRENCES = 3
+# Share of gaps that must match the period for a group to count as a schedule
+RECURRING_MIN_REGULARITY = 0.75
+# (name, typical gap in days, allowed deviation in days, step to the next occurrence)
+RECURRING_PERIODS = [
+    ('weekly', 7, 1, pd.DateOffset(weeks=1)),
+    ('monthly', 30.44, 3.5, pd.DateOffset(months=1)),
+    ('yearly', 365.25, 5, pd.DateOffset(years=1)),
+]
+
+# Labels that add to the balance; every other transation_type (expense, investment, ...) takes away
+BALANCE_INFLOW_TYPES = ['income']
+
+# SQL for the first day of the period holding a stored date, per trend granularity
+PERIOD_START_SQL = {
+    'D': "substr({column}, 1, 10)",
+    'ME': "substr({column}, 1, 7) || '-01'",
+    'QE': "printf('%s-%02d-01', substr({column}, 1, 4), (CAST(substr({column}, 6, 2) AS INTEGER) - 1) / 3 * 3 + 1)",
+    'YE': "substr({column}, 1, 4) || '-01-01'",
+}
+# Consecutive integer per period (from a period start date) and how many periods make a year,
+# so window frames can reach exactly one period or one year back even across empty periods
+PERIOD_INDEX_SQL = {
+    'D': ("CAST(julianday({column}) AS INTEGER)", 365),
+    'ME': ("CAST(substr({column}, 1, 4) AS INTEGER) * 12 + CAST(substr({column}, 6, 2) AS INTEGER)", 12),
+    'QE': ("CAST(substr({column}, 1, 4) AS INTEGER) * 4 + (CAST(substr({column}, 6, 2) AS INTEGER) - 1) / 3", 4),
+    'YE': ("CAST(substr({column}, 1, 4) AS INTEGER)", 1),
+}
+
+def normalize_text(series):
+    """Collapse whitespace and case so near-identical labels compare equal"""
+    return series.fillna('').astype(str).str.strip().str.replace(r'\s+', ' ', regex=True).str.casefold()
+
+def _normalize_date(value):
+    # The date picker sends either YYYY-MM-DD or a full ISO timestamp
+    return str(value)[:10] if value else None
+
+def compute_fingerprints(df):
+    """
+    Stable 64-bit content hash for each row of the six transaction fields.
+    Text is normalized, amounts are taken in integer minor units and dates in
+    ISO form, so whitespace/case variants and float noise hash identically.
+    """
+    amounts = pd.to_numeric(df['amount'], errors='coerce')
+    minor_units = (amounts * 100).round().map(lambda v: '' if pd.isna(v) else str(int(v)))
+    dates = pd.to_datetime(df['date'], errors='coerce', format='mixed')
+    date_text = dates.dt.strftime('%Y-%m-%d %H:%M:%S').where(dates.notna(), normalize_text(df['date']))
+    canonical = (
+        normalize_text(df['transation_type']) + '\x1f' + minor_units + '\x1f' +
+        normalize_text(df['type']) + '\x1f' + normalize_text(df['description']) + '\x1f' +
+        date_text + '\x1f' + normalize_text(df['title'])
+    )
+    return _hash64(canonical)
+
+def _hash64(values):
+    # Signed so the digest fits SQLite's INTEGER type
+    return [
+        int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+        for value in values
+    ]
+
+def compute_recurrence_keys(df):
+    """
+    64-bit key shared by transactions that could be occurrences of one schedule:
+    same transation_type, title and description (digits ignored, since statements
+    embed reference numbers) and an amount in the same relative band.
+    """
+    amounts = pd.to_numeric(df['amount'], errors='coerce')
+    band = np.floor(np.log(amounts.abs().where(amounts != 0)) / np.log1p(RECURRING_AMOUNT_TOLERANCE))
+    band_text = np.sign(amounts).map(lambda v: '' if pd.isna(v) else str(int(v))) + band.map(lambda v: '' if pd.isna(v) else str(int(v)))
+    canonical = (
+        normalize_text(df['transation_type']) + '\x1f' + normalize_text(df['title']) + '\x1f' +
+        normalize_text(df['description']).str.replace(r'\d+', '#', regex=True) + '\x1f' + band_text
+    )
+    return _hash64(canonical)
+
+def _migrate_to_fingerprints(c):
+    # Rebuild the table without the wide UNIQUE index, backfilling fingerprints batch by batch
+    c.execute('''CREATE TABLE transactions_new (
+        id INTEGER PRIMARY KEY,
         transation_type TEXT,
         amount REAL,
         type TEXT,
         description TEXT,
         date TEXT,
         title TEXT,
-        UNIQUE(transation_type, amount, type, description, date, title)
+        fingerprint INTEGER
+    )''')
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='transactions'")
+    if c.fetchone():
+        columns = ', '.join(TRANSACTION_COLUMNS)
+        last_rowid = 0
+        while True:
+            c.execute(f'SELECT rowid, {columns} FROM transactions WHERE rowid > ? ORDER BY rowid LIMIT ?', (last_rowid, MIGRATION_BATCH_SIZE))
+            rows = c.fetchall()
+            if not rows:
+                break
+            batch = pd.DataFrame([row[1:] for row in rows], columns=TRANSACTION_COLUMNS)
+            fingerprints = compute_fingerprints(batch)
+            c.executemany(
+                f'INSERT INTO transactions_new ({columns}, fingerprint) VALUES (?,?,?,?,?,?,?)',
+                [row[1:] + (fp,) for row, fp in zip(rows, fingerprints)]
+            )
+            last_rowid = rows[-1][0]
+        c.execute('DROP TABLE transactions')
+    c.execute('ALTER TABLE transactions_new RENAME TO transactions')
+
+def _migrate_to_lookup_tables(c):
+    # Move the repeated label text into lookup tables and keep only integer ids per row
+    joins = []
+    for column in CATEGORICAL_COLUMNS:
+        c.execute(f'CREATE TABLE IF NOT EXISTS lookup_{column} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)')
+        c.execute(f'INSERT OR IGNORE INTO lookup_{column} (name) SELECT DISTINCT CAST({column} AS TEXT) FROM transactions WHERE {column} IS NOT NULL')
+        joins.append(f'LEFT JOIN lookup_{column} l_{column} ON l_{column}.name = CAST(t.{column} AS TEXT)')
+    c.execute('''CREATE TABLE transactions_new (
+        id INTEGER PRIMARY KEY,
+        transation_type_id INTEGER REFERENCES lookup_transation_type(id),
+        amount REAL,
+        type_id INTEGER REFERENCES lookup_type(id),
+        description TEXT,
+        date TEXT,
+        title_id INTEGER REFERENCES lookup_title(id),
+        fingerprint INTEGER
+    )''')
+    selected = ', '.join(f'l_{col}.id' if col in CATEGORICAL_COLUMNS else f't.{col}' for col in TRANSACTION_COLUMNS)
+    c.execute(f'INSERT INTO transactions_new (id, {", ".join(STORED_COLUMNS)}, fingerprint) SELECT t.id, {selected}, t.fingerprint FROM transactions t {" ".join(joins)}')
+    c.execute('DROP TABLE transactions')
+    c.execute('ALTER TABLE transactions_new RENAME TO transactions')
+
+def _migrate_to_search_index(c):
+    # Full-text index over description and title; rowid mirrors transactions.id
+    c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(description, title, tokenize='unicode61 remove_diacritics 2')")
+    _index_for_search(c, 0)
+
+def _migrate_to_data_version(c):
+    # Single-row counter bumped by every write, so readers can tell when cached results are stale
+    c.execute('CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)')
+    c.execute('INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)')
+
+def _migrate_to_anomaly_scores(c):
+    # Per-group running sums let new uploads be scored without rescanning history
+    c.execute('ALTER TABLE transactions ADD COLUMN anomaly_score REAL')
+    c.execute('''CREATE TABLE IF NOT EXISTS group_stats (
+        transation_type_id INTEGER NOT NULL,
+        title_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        total_sq REAL NOT NULL,
+        PRIMARY KEY (transation_type_id, title_id)
+    )''')
+    c.execute('''INSERT INTO group_stats
+        SELECT COALESCE(transation_type_id, 0), COALESCE(title_id, 0), COUNT(*), SUM(amount), SUM(amount * amount)
+        FROM transactions WHERE amount IS NOT NULL GROUP BY 1, 2''')
+    c.execute('SELECT id, transation_type_id, title_id, amount, date FROM transactions')
+    history = pd.DataFrame(c.fetchall(), columns=['id', 'transation_type', 'title', 'amount', 'date'])
+    history['score'] = detect_anomalies(history.fillna({'transation_type': 0, 'title': 0}))
+    scored = history.dropna(subset=['score'])
+    for i in range(0, len(scored), MIGRATION_BATCH_SIZE):
+        batch = scored.iloc[i:i + MIGRATION_BATCH_SIZE]
+        c.executemany('UPDATE transactions SET anomaly_score = ? WHERE id = ?', zip(batch['score'].tolist(), batch['id'].tolist()))
+
+def _migrate_to_recurring_schedules(c):
+    c.execute('ALTER TABLE transactions ADD COLUMN recurrence_key INTEGER')
+    c.execute('''CREATE TABLE IF NOT EXISTS recurring_schedules (
+        recurrence_key INTEGER PRIMARY KEY,
+        transation_type TEXT,
+        title TEXT,
+        description TEXT,
+        amount REAL,
+        period TEXT NOT NULL,
+        interval_days REAL,
+        occurrences INTEGER,
+        last_date TEXT,
+        next_date TEXT
+    )''')
+    last_id = 0
+    while True:
+        c.execute('''SELECT t.id, tt.name, t.amount, t.description, ti.name FROM transactions t
+            LEFT JOIN lookup_transation_type tt ON tt.id = t.transation_type_id
+            LEFT JOIN lookup_title ti ON ti.id = t.title_id
+            WHERE t.id > ? ORDER BY t.id LIMIT ?''', (last_id, MIGRATION_BATCH_SIZE))
+        rows = c.fetchall()
+        if not rows:
+            break
+        batch = pd.DataFrame(rows, columns=['id', 'transation_type', 'amount', 'description', 'title'])
+        c.executemany('UPDATE transactions SET recurrence_key = ? WHERE id = ?', zip(compute_recurrence_keys(batch), batch['id'].tolist()))
+        last_id = rows[-1][0]
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_recurrence_key ON transactions(recurrence_key)')
+    rebuild_recurring_schedules(c)
+
+def _migrate_to_daily_balance(c):
+    # Per-day net movement with its running total, so balance-at-date is a single index seek
+    c.execute('CREATE TABLE IF NOT EXISTS daily_balance (day TEXT PRIMARY KEY, net REAL NOT NULL, cumulative REAL NOT NULL DEFAULT 0)')
+    inflows = ','.join(['?']*len(BALANCE_INFLOW_TYPES))
+    c.execute(f'''INSERT INTO daily_balance (day, net)
+        SELECT substr(t.date, 1, 10), SUM(CASE WHEN lower(trim(tt.name)) IN ({inflows}) THEN t.amount ELSE -t.amount END)
+        FROM transactions t LEFT JOIN lookup_transation_type tt ON tt.id = t.transation_type_id
+        WHERE t.amount IS NOT NULL AND t.date IS NOT NULL GROUP BY 1''', BALANCE_INFLOW_TYPES)
+    _refresh_cumulative_balance(c, '')
+
+def _migrate_to_change_feed(c):
+    # One row per inserted or deleted transaction, stamped with the data version that made it.
+    # Existing rows are replayed as inserts under a fresh version, so a client starting from
+    # version 0 sees everything.
+    c.execute('CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY, version INTEGER, op TEXT NOT NULL, transaction_id INTEGER)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_changes_version ON changes(version)')
+    c.execute("INSERT INTO changes (op, transaction_id) SELECT 'insert', id FROM transactions ORDER BY id")
+    _bump_data_version(c)
+
+def _migrate_to_autoincrement(c):
+    # Ids and change seqs must never be handed out twice: a deleted max id would otherwise
+    # come back on the next insert and the feed would pair the old insert with the new row,
+    # and a clear would restart the seq under clients holding a later cursor
+    c.execute('''CREATE TABLE transactions_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transation_type_id INTEGER REFERENCES lookup_transation_type(id),
+        amount REAL,
+        type_id INTEGER REFERENCES lookup_type(id),
+        description TEXT,
+        date TEXT,
+        title_id INTEGER REFERENCES lookup_title(id),
+        fingerprint INTEGER,
+        anomaly_score REAL,
+        recurrence_key INTEGER
     )''')
-    conn.commit()
+    columns = f'id, {", ".join(STORED_COLUMNS)}, fingerprint, anomaly_score, recurrence_key'
+    c.execute(f'INSERT INTO transactions_new ({columns}) SELECT {columns} FROM transactions')
+    c.execute('DROP TABLE transactions')
+    c.execute('ALTER TABLE transactions_new RENAME TO transactions')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_recurrence_key ON transactions(recurrence_key)')
+    c.execute('CREATE TABLE changes_new (seq INTEGER PRIMARY KEY AUTOINCREMENT, version INTEGER, op TEXT NOT NULL, transaction_id INTEGER)')
+    c.execute('INSERT INTO changes_new (seq, version, op, transaction_id) SELECT seq, version, op, transaction_id FROM changes')
+    c.execute('DROP TABLE changes')
+    c.execute('ALTER TABLE changes_new RENAME TO changes')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_changes_version ON changes(version)')
+    # Ids the feed has already mentioned stay retired even if their row is gone
+    c.execute('SELECT MAX((SELECT COALESCE(MAX(id), 0) FROM transactions), (SELECT COALESCE(MAX(transaction_id), 0) FROM changes))')
+    high_water = c.fetchone()[0]
+    c.execute("DELETE FROM sqlite_sequence WHERE name = 'transactions'")
+    c.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('transactions', ?)", (high_water,))
+
+def get_connection():
+    return sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT)
+
+def _snapshot_path(version):
+    return os.path.join(SNAPSHOT_DIR, f'snapshot-{version:012d}.db')
+
+def _list_snapshots():
+    try:
+        names = os.listdir(SNAPSHOT_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.startswith('snapshot-') and name.endswith('.db'))
+
+def publish_snapshot():
+    """
+    Copy the committed database into a new snapshot file named after its data version.
+    The copy is written under a temporary name and renamed into place, so readers only
+    ever see complete snapshots; the highest version present is the current one.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    source = get_connection()
+    try:
+        # The backup reads one consistent state, so the version and the copy always agree
+        source.execute('BEGIN')
+        version = source.execute('SELECT version FROM data_version WHERE id = 1').fetchone()[0]
+        path = _snapshot_path(version)
+        if os.path.exists(path):
+            return path
+        fd, partial = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix='.partial')
+        os.close(fd)
+        try:
+            target = sqlite3.connect(partial)
+            try:
+                source.backup(target)
+                # Rollback journal mode so read-only readers don't need a -wal or -shm file
+                target.execute('PRAGMA journal_mode=DELETE')
+            finally:
+                target.close()
+            os.replace(partial, path)
+        except BaseException:
+            os.remove(partial)
+            raise
+    finally:
+        source.close()
+    for name in _list_snapshots()[:-(SNAPSHOT_KEEP + 1)]:
+        try:
+            os.remove(os.path.join(SNAPSHOT_DIR, name))
+        except OSError:
+            # Still open somewhere (Windows) or already removed by another worker
+            pass
+    return path
+
+def get_read_connection():
+    """
+    Connection for queries that don't write. In snapshot mode it opens the newest
+    snapshot read-only and memory-mapped; otherwise it is a normal connection.
+    """
+    if READ_SNAPSHOTS:
+        for name in reversed(_list_snapshots()):
+            uri = Path(SNAPSHOT_DIR, name).resolve().as_uri() + '?mode=ro&immutable=1'
+            try:
+                conn = sqlite3.connect(uri, uri=True)
+                conn.execute(f'PRAGMA mmap_size = {SNAPSHOT_MMAP_SIZE}')
+                return conn
+            except sqlite3.OperationalError:
+                # Pruned between listing and opening; fall back to the one before
+                continue
+    return get_connection()
+
+@contextmanager
+def write_transaction():
+    """
+    Cursor inside a write transaction, committed on success and rolled back on error.
+    BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue on
+    the busy timeout instead of failing when a read tries to upgrade to a write.
+    In snapshot mode the committed state is published before returning, so the
+    caller's own follow-up reads already see it; if publishing fails the error is
+    logged and readers stay on the previous snapshot until the next write.
+    """
+    conn = get_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    if READ_SNAPSHOTS:
+        # The write is already committed; a failed copy leaves readers on the previous
+        # snapshot until the next write publishes again, rather than failing the caller
+        try:
+            publish_snapshot()
+        except Exception as e:
+            print(f"Snapshot publish failed: {e}")
+
+# Initialize DB if not exists, migrating older schemas in place
+def init_db():
+    conn = get_connection()
+    # WAL lets dashboard reads proceed while an import is writing
+    conn.execute('PRAGMA journal_mode=WAL')
     conn.close()
+    with write_transaction() as c:
+        _migrate(c)
 
-init_db()
+def _migrate(c):
+    # Workers start concurrently; the version is read under the write lock so only one migrates
+    c.execute('PRAGMA user_version')
+    version = c.fetchone()[0]
+    if version < 1:
+        _migrate_to_fingerprints(c)
+    if version < 2:
+        _migrate_to_lookup_tables(c)
+    if version < 3:
+        _migrate_to_search_index(c)
+    if version < 4:
+        _migrate_to_data_version(c)
+    if version < 5:
+        _migrate_to_anomaly_scores(c)
+    if version < 6:
+        _migrate_to_recurring_schedules(c)
+    if version < 7:
+        _migrate_to_daily_balance(c)
+    if version < 8:
+        _migrate_to_change_feed(c)
+    if version < 9:
+        _migrate_to_autoincrement(c)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_fingerprint ON transactions(fingerprint)')
+    c.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
 
-# Helper to insert data, check for duplicates, and clear DB
-def insert_transactions(df):
-    df = df.copy()
+def _existing_fingerprints(c, fingerprints):
+    found = set()
+    for i in range(0, len(fingerprints), LOOKUP_CHUNK_SIZE):
+        chunk = fingerprints[i:i + LOOKUP_CHUNK_SIZE]
+        c.execute('SELECT fingerprint FROM transactions WHERE fingerprint IN (%s)' % ','.join(['?']*len(chunk)), chunk)
+        found.update(row[0] for row in c.fetchall())
+    return found
+
+def _encode_labels(c, values):
+    """Map label values to lookup ids, adding any labels not seen before"""
+    column = values.name
+    labels = values.dropna().unique().tolist()
+    c.executemany(f'INSERT OR IGNORE INTO lookup_{column} (name) VALUES (?)', [(label,) for label in labels])
+    ids = {}
+    for i in range(0, len(labels), LOOKUP_CHUNK_SIZE):
+        chunk = labels[i:i + LOOKUP_CHUNK_SIZE]
+        c.execute(f'SELECT name, id FROM lookup_{column} WHERE name IN (%s)' % ','.join(['?']*len(chunk)), chunk)
+        ids.update(c.fetchall())
+    return [ids.get(value) for value in values]
+
+def _prepare_rows(df):
+    df = df[TRANSACTION_COLUMNS].reset_index(drop=True)
     df['date'] = df['date'].astype(str)
-    conn = sqlite3.connect(DB_PATH)
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    df['fingerprint'] = compute_fingerprints(df)
+    return df
+
+def _encode_rows(c, df):
+    encoded = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        encoded[column] = _encode_labels(c, df[column])
+    return encoded
+
+def _expanding_scores(df, prior=None):
+    """
+    Vectorized z-score of each amount against the rows before it (by date) in its
+    (transation_type, title) group. prior carries count/total/total_sq per row for
+    history that isn't in df, so a new batch continues where stored stats left off.
+    """
+    order = df.sort_values('date', kind='stable').index
+    amounts = pd.to_numeric(df['amount'], errors='coerce').loc[order]
+    keys = [df['transation_type'].loc[order], df['title'].loc[order]]
+    valid = amounts.notna()
+    values = amounts.fillna(0.0)
+    grouped_values = values.groupby(keys, sort=False)
+    count = valid.astype(float).groupby(keys, sort=False).cumsum() - valid
+    total = grouped_values.cumsum() - values
+    total_sq = (values * values).groupby(keys, sort=False).cumsum() - values * values
+    if prior is not None:
+        count = count + prior['count'].loc[order]
+        total = total + prior['total'].loc[order]
+        total_sq = total_sq + prior['total_sq'].loc[order]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq / count - mean * mean, 0.0))
+        spread = np.maximum(std, ANOMALY_MIN_SPREAD * mean.abs())
+        scores = (amounts - mean).abs() / spread
+    scores = scores.where((count >= ANOMALY_MIN_HISTORY) & (spread > 0))
+    return scores.reindex(df.index)
+
+def detect_anomalies(df):
+    """Anomaly score per row over a full history frame (amount, date, transation_type, title)"""
+    return _expanding_scores(df)
+
+def detect_recurring(df):
+    """
+    Find recurring schedules in a transaction frame. Rows are grouped by recurrence
+    key and the gaps between consecutive dates in each group are compared against
+    the weekly/monthly/yearly periods, all as vectorized group operations.
+    Returns one row per detected schedule.
+    """
+    keys = df['recurrence_key'] if 'recurrence_key' in df else compute_recurrence_keys(df)
+    data = pd.DataFrame({
+        'recurrence_key': np.asarray(keys, dtype=np.int64),
+        'date': pd.to_datetime(df['date'], errors='coerce', format='mixed').to_numpy(),
+        'amount': pd.to_numeric(df['amount'], errors='coerce').to_numpy(),
+        'transation_type': df['transation_type'].astype(object).to_numpy(),
+        'title': df['title'].astype(object).to_numpy(),
+        'description': df['description'].astype(object).to_numpy(),
+    }).dropna(subset=['date', 'amount'])
+    data = data.sort_values(['recurrence_key', 'date'], kind='stable')
+    grouped = data.groupby('recurrence_key', sort=False)
+    data['gap'] = grouped['date'].diff().dt.total_seconds() / 86400
+    summary = grouped.agg(
+        occurrences=('date', 'size'),
+        last_date=('date', 'max'),
+        amount=('amount', 'median'),
+        interval_days=('gap', 'median'),
+        transation_type=('transation_type', 'last'),
+        title=('title', 'last'),
+        description=('description', 'last'),
+    )
+    summary = summary[summary['occurrences'] >= RECURRING_MIN_OCCURRENCES]
+    summary['period'] = None
+    summary['next_date'] = pd.NaT
+    for name, typical, deviation, step in RECURRING_PERIODS:
+        on_period = (data['gap'] - typical).abs() <= deviation
+        regularity = on_period.groupby(data['recurrence_key']).sum().reindex(summary.index) / (summary['occurrences'] - 1)
+        matches = summary['period'].isna() & ((summary['interval_days'] - typical).abs() <= deviation) & (regularity >= RECURRING_MIN_REGULARITY)
+        summary.loc[matches, 'period'] = name
+        summary.loc[matches, 'next_date'] = summary.loc[matches, 'last_date'] + step
+    return summary.dropna(subset=['period']).reset_index()
+
+def _refresh_recurring(c, recurrence_keys):
+    """Re-detect the schedules for the given keys from their full history"""
+    for i in range(0, len(recurrence_keys), LOOKUP_CHUNK_SIZE):
+        chunk = recurrence_keys[i:i + LOOKUP_CHUNK_SIZE]
+        placeholders = ','.join(['?']*len(chunk))
+        c.execute(f'''SELECT t.recurrence_key, tt.name, t.amount, t.description, t.date, ti.name FROM transactions t
+            LEFT JOIN lookup_transation_type tt ON tt.id = t.transation_type_id
+            LEFT JOIN lookup_title ti ON ti.id = t.title_id
+            WHERE t.recurrence_key IN ({placeholders})''', chunk)
+        history = pd.DataFrame(c.fetchall(), columns=['recurrence_key', 'transation_type', 'amount', 'description', 'date', 'title'])
+        schedules = detect_recurring(history)
+        c.execute(f'DELETE FROM recurring_schedules WHERE recurrence_key IN ({placeholders})', chunk)
+        c.executemany('''INSERT INTO recurring_schedules
+            (recurrence_key, transation_type, title, description, amount, period, interval_days, occurrences, last_date, next_date)
+            VALUES (?,?,?,?,?,?,?,?,?,?)''', [
+            (int(row.recurrence_key), row.transation_type, row.title, row.description, float(row.amount), row.period,
+             float(row.interval_days), int(row.occurrences), row.last_date.strftime('%Y-%m-%d'), row.next_date.strftime('%Y-%m-%d'))
+            for row in schedules.itertuples(index=False)
+        ])
+
+def rebuild_recurring_schedules(c):
+    """Batch detection over the whole history, one chunk of groups at a time"""
+    c.execute('DELETE FROM recurring_schedules')
+    c.execute('SELECT DISTINCT recurrence_key FROM transactions WHERE recurrence_key IS NOT NULL ORDER BY recurrence_key')
+    _refresh_recurring(c, [row[0] for row in c.fetchall()])
+
+def balance_as_of(date):
+    """Net balance (inflows minus outflows) of every transaction up to and including date"""
+    conn = get_read_connection()
     c = conn.cursor()
-    # Check for duplicates
-    placeholders = ','.join(['?']*6)
-    unique_rows = []
-    duplicate_rows = []
-    for row in df.itertuples(index=False):
-        c.execute(f'SELECT 1 FROM transactions WHERE transation_type=? AND amount=? AND type=? AND description=? AND date=? AND title=?', row)
-        if c.fetchone():
-            duplicate_rows.append(row)
-        else:
-            unique_rows.append(row)
-    if unique_rows:
-        c.executemany(f'INSERT INTO transactions VALUES (?,?,?,?,?,?)', unique_rows)
-    conn.commit()
+    c.execute('SELECT cumulative FROM daily_balance WHERE day <= ? ORDER BY day DESC LIMIT 1', (_normalize_date(date),))
+    row = c.fetchone()
     conn.close()
-    return duplicate_rows
+    return row[0] if row else 0.0
 
-def overwrite_duplicates(df):
-    df = df.copy()
-    df['date'] = df['date'].astype(str)
-    conn = sqlite3.connect(DB_PATH)
+def balance_curve(start_date=None, end_date=None):
+    """Balance at the close of each day with activity in the range, opening from the balance before it"""
+    conn = get_read_connection()
     c = conn.cursor()
-    for row in df.itertuples(index=False):
-        c.execute('''DELETE FROM transactions WHERE transation_type=? AND amount=? AND type=? AND description=? AND date=? AND title=?''', row)
-        c.execute('''INSERT INTO transactions VALUES (?,?,?,?,?,?)''', row)
-    conn.commit()
+    start = _normalize_date(start_date)
+    end = _normalize_date(end_date)
+    points = []
+    if start:
+        c.execute('SELECT cumulative FROM daily_balance WHERE day < ? ORDER BY day DESC LIMIT 1', (start,))
+        row = c.fetchone()
+        points.append((start, row[0] if row else 0.0))
+    query = 'SELECT day, cumulative FROM daily_balance WHERE 1=1'
+    params = []
+    if start:
+        query += ' AND day >= ?'
+        params.append(start)
+    if end:
+        query += ' AND day <= ?'
+        params.append(end)
+    c.execute(query + ' ORDER BY day', params)
+    points.extend(c.fetchall())
     conn.close()
+    curve = pd.DataFrame(points, columns=['date', 'balance'])
+    curve['date'] = pd.to_datetime(curve['date'])
+    return curve.drop_duplicates('date', keep='last')
 
-def clear_db():
-    conn = sqlite3.connect(DB_PATH)
+def fetch_upcoming_payments(start_date, end_date, transation_type=None):
+    """Expected occurrences of detected schedules between two dates"""
+    conn = get_read_connection()
     c = conn.cursor()
-    c.execute('DELETE FROM transactions')
-    conn.commit()
+    query = 'SELECT transation_type, title, amount, period, next_date FROM recurring_schedules WHERE next_date <= ?'
+    params = [pd.Timestamp(end_date).strftime('%Y-%m-%d')]
+    if transation_type:
+        query += ' AND transation_type IN (%s)' % ','.join(['?']*len(transation_type))
+        params.extend(transation_type)
+    c.execute(query, params)
+    schedules = c.fetchall()
     conn.close()
+    steps = {name: step for name, _, _, step in RECURRING_PERIODS}
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    payments = []
+    for tt, title, amount, period, next_date in schedules:
+        occurrence = pd.Timestamp(next_date)
+        # A schedule whose next payment is long overdue has most likely ended
+        if occurrence < start - steps[period]:
+            continue
+        while occurrence <= end:
+            if occurrence >= start:
+                payments.append((occurrence, amount, title, tt))
+            occurrence += steps[period]
+    return pd.DataFrame(payments, columns=['date', 'amount', 'title', 'transation_type'])
+
+def _group_keys(encoded):
+    return pd.DataFrame({
+        'transation_type_id': pd.Series(encoded['transation_type'], index=encoded.index, dtype='object').fillna(0).astype(np.int64),
+        'title_id': pd.Series(encoded['title'], index=encoded.index, dtype='object').fillna(0).astype(np.int64),
+    })
 
-def fetch_transactions(start_date=None, end_date=None, transation_type=None, type_filter=None):
-    conn = sqlite3.connect(DB_PATH)
+def _load_group_stats(c, keys):
+    title_ids = keys['title_id'].unique().tolist()
+    rows = []
+    for i in range(0, len(title_ids), LOOKUP_CHUNK_SIZE):
+        chunk = title_ids[i:i + LOOKUP_CHUNK_SIZE]
+        c.execute('SELECT transation_type_id, title_id, count, total, total_sq FROM group_stats WHERE title_id IN (%s)' % ','.join(['?']*len(chunk)), chunk)
+        rows.extend(c.fetchall())
+    stats = pd.DataFrame(rows, columns=['transation_type_id', 'title_id', 'count', 'total', 'total_sq'])
+    prior = keys.merge(stats, on=['transation_type_id', 'title_id'], how='left')
+    prior.index = keys.index
+    return prior[['count', 'total', 'total_sq']].astype(float).fillna(0.0)
+
+def _add_group_stats(c, keys, amounts, sign=1):
+    batch = keys.assign(amount=pd.to_numeric(amounts, errors='coerce')).dropna(subset=['amount'])
+    batch['amount_sq'] = batch['amount'] * batch['amount']
+    sums = batch.groupby(['transation_type_id', 'title_id']).agg(count=('amount', 'size'), total=('amount', 'sum'), total_sq=('amount_sq', 'sum')).reset_index()
+    c.executemany('''INSERT INTO group_stats (transation_type_id, title_id, count, total, total_sq) VALUES (?,?,?,?,?)
+        ON CONFLICT (transation_type_id, title_id) DO UPDATE SET
+            count = count + excluded.count, total = total + excluded.total, total_sq = total_sq + excluded.total_sq''',
+        [(int(t), int(ti), sign * int(n), sign * s, sign * sq) for t, ti, n, s, sq in sums.itertuples(index=False)])
+
+def _signed_amounts(transation_type, amounts):
+    amounts = pd.to_numeric(amounts, errors='coerce')
+    return amounts.where(normalize_text(transation_type).isin(BALANCE_INFLOW_TYPES), -amounts)
+
+def _refresh_cumulative_balance(c, from_day):
+    # Running totals only change from the earliest touched day onwards
+    c.execute('''WITH running AS (SELECT day, SUM(net) OVER (ORDER BY day) AS cumulative FROM daily_balance)
+        UPDATE daily_balance SET cumulative = running.cumulative
+        FROM running WHERE daily_balance.day = running.day AND daily_balance.day >= ?''', (from_day,))
+
+def _add_daily_balance(c, dates, signed_amounts):
+    moves = pd.DataFrame({'day': pd.Series(dates).astype(str).str[:10].to_numpy(), 'net': pd.Series(signed_amounts).to_numpy()}).dropna()
+    if moves.empty:
+        return
+    net = moves.groupby('day')['net'].sum()
+    c.executemany('''INSERT INTO daily_balance (day, net) VALUES (?, ?)
+        ON CONFLICT (day) DO UPDATE SET net = net + excluded.net''', zip(net.index.tolist(), net.tolist()))
+    _refresh_cumulative_balance(c, net.index.min())
+
+def _forget_rows(c, fingerprints):
+    # Take rows about to be deleted back out of the running sums and daily balances
+    for i in range(0, len(fingerprints), LOOKUP_CHUNK_SIZE):
+        chunk = fingerprints[i:i + LOOKUP_CHUNK_SIZE]
+        c.execute('''SELECT COALESCE(t.transation_type_id, 0), COALESCE(t.title_id, 0), t.amount, t.date, tt.name FROM transactions t
+            LEFT JOIN lookup_transation_type tt ON tt.id = t.transation_type_id
+            WHERE t.amount IS NOT NULL AND t.fingerprint IN (%s)''' % ','.join(['?']*len(chunk)), chunk)
+        removed = pd.DataFrame(c.fetchall(), columns=['transation_type_id', 'title_id', 'amount', 'date', 'transation_type'])
+        if not removed.empty:
+            _add_group_stats(c, removed[['transation_type_id', 'title_id']], removed['amount'], sign=-1)
+            _add_daily_balance(c, removed['date'], -_signed_amounts(removed['transation_type'], removed['amount']))
+
+def _decode_labels(c, column, ids):
+    """Build a Categorical straight from stored lookup ids, with -1 for missing labels"""
+    c.execute(f'SELECT id, name FROM lookup_{column} ORDER BY id')
+    lookup = c.fetchall()
+    lookup_ids = np.array([row[0] for row in lookup], dtype=np.int64)
+    raw = np.asarray(ids, dtype=np.int64)
+    codes = np.searchsorted(lookup_ids, raw)
+    codes[raw < 0] = -1
+    return pd.Categorical.from_codes(codes, categories=[row[1] for row in lookup])
+
+def _index_for_search(c, after_id):
+    # Ids only ever grow (AUTOINCREMENT), so new rows are exactly those past after_id
+    c.execute('''INSERT INTO transactions_fts (rowid, description, title)
+        SELECT t.id, t.description, l.name FROM transactions t
+        LEFT JOIN lookup_title l ON l.id = t.title_id
+        WHERE t.id > ?''', (after_id,))
+
+def _insert_rows(c, df):
+    """Insert prepared rows and keep the derived tables in step"""
+    c.execute('SELECT COALESCE(MAX(id), 0) FROM transactions')
+    last_id = c.fetchone()[0]
+    encoded = _encode_rows(c, df)
+    keys = _group_keys(encoded)
+    scoring = pd.DataFrame({'transation_type': keys['transation_type_id'], 'title': keys['title_id'], 'amount': encoded['amount'], 'date': encoded['date']})
+    encoded['anomaly_score'] = _expanding_scores(scoring, _load_group_stats(c, keys))
+    encoded['recurrence_key'] = compute_recurrence_keys(df)
+    c.executemany(INSERT_TRANSACTION_SQL, encoded[TRANSACTION_COLUMNS + ['fingerprint', 'anomaly_score', 'recurrence_key']].itertuples(index=False))
+    _add_group_stats(c, keys, encoded['amount'])
+    _add_daily_balance(c, df['date'], _signed_amounts(df['transation_type'], df['amount']))
+    _index_for_search(c, last_id)
+    _refresh_recurring(c, encoded['recurrence_key'].unique().tolist())
+    c.execute("INSERT INTO changes (op, transaction_id) SELECT 'insert', id FROM transactions WHERE id > ? ORDER BY id", (last_id,))
+
+def _bump_data_version(c):
+    c.execute('UPDATE data_version SET version = version + 1 WHERE id = 1')
+    # Changes recorded in this transaction belong to the version it produces
+    c.execute('UPDATE changes SET version = (SELECT version FROM data_version WHERE id = 1) WHERE version IS NULL')
+
+def get_data_version():
+    conn = get_read_connection()
     c = conn.cursor()
-    query = 'SELECT * FROM transactions WHERE 1=1'
+    c.execute('SELECT version FROM data_version WHERE id = 1')
+    version = c.fetchone()[0]
+    conn.close()
+    return version
+
+def _select_list(columns, table='transactions'):
+    """SELECT expressions for columns, in the form _rows_to_frame expects"""
+    selected = []
+    for column in columns:
+        if column in CATEGORICAL_COLUMNS:
+            selected.append(f'COALESCE({table}.{column}_id, -1)')
+        else:
+            selected.append(f'{table}.{column}')
+    return ', '.join(selected)
+
+def _typed_columns(rows, columns):
+    """
+    Typed numpy arrays for fetched rows (from _select_list): datetime64 dates, float64
+    amounts and scores, int64 lookup ids for labels, objects for free text.
+    """
+    # One C-level copy into a 2-D object array; each column is then a strided view of it
+    table = np.empty((len(rows), len(columns)), dtype=object)
+    if rows:
+        table[:] = rows
+    data = {}
+    for i, column in enumerate(columns):
+        values = table[:, i]
+        if column in CATEGORICAL_COLUMNS:
+            data[column] = values.astype(np.int64)
+        elif column == 'date':
+            data[column] = pd.to_datetime(values, format='ISO8601', errors='coerce').to_numpy()
+        elif column in FLOAT_COLUMNS:
+            try:
+                data[column] = values.astype(np.float64)
+            except (TypeError, ValueError):
+                # Text that slipped in through an old import
+                data[column] = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            data[column] = values.copy()
+    return data
+
+def _columns_to_frame(c, data, columns):
+    for column in CATEGORICAL_COLUMNS:
+        if column in data:
+            data[column] = _decode_labels(c, column, data[column])
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+def _rows_to_frame(c, rows, columns=TRANSACTION_COLUMNS):
+    return _columns_to_frame(c, _typed_columns(rows, columns), columns)
+
+def _filter_clause(start_date=None, end_date=None, transation_type=None, type_filter=None, anomalies_only=False):
+    clause = ''
     params = []
+    if anomalies_only:
+        clause += ' AND anomaly_score >= ?'
+        params.append(ANOMALY_THRESHOLD)
+    # Picker values may be full ISO timestamps; compare whole days against the stored text
+    start_date = _normalize_date(start_date)
+    end_date = _normalize_date(end_date)
     if start_date:
-        query += ' AND date >= ?'
+        clause += ' AND date >= ?'
         params.append(start_date)
     if end_date:
-        query += ' AND date <= ?'
+        clause += " AND date < date(?, '+1 day')"
         params.append(end_date)
     if transation_type:
-        query += ' AND transation_type IN (%s)' % ','.join(['?']*len(transation_type))
+        clause += ' AND transation_type_id IN (SELECT id FROM lookup_transation_type WHERE name IN (%s))' % ','.join(['?']*len(transation_type))
         params.extend(transation_type)
     if type_filter:
-        query += ' AND type IN (%s)' % ','.join(['?']*len(type_filter))
+        clause += ' AND type_id IN (SELECT id FROM lookup_type WHERE name IN (%s))' % ','.join(['?']*len(type_filter))
         params.extend(type_filter)
-    c.execute(query, params)
-    rows = c.fetchall()
+    return clause, params
+
+def fetch_label_options():
+    """Dropdown options for each categorical column, read from the lookup tables"""
+    conn = get_read_connection()
+    c = conn.cursor()
+    options = {}
+    for column in CATEGORICAL_COLUMNS:
+        c.execute(f'SELECT name FROM lookup_{column} ORDER BY name')
+        options[column] = [{'label': str(name), 'value': name} for (name,) in c.fetchall()]
+    conn.close()
+    return options
+
+# Helper to insert data, check for duplicates, and clear DB
+def insert_transactions(df):
+    df = _prepare_rows(df)
+    with write_transaction() as c:
+        # Check for duplicates by fingerprint; repeats within the upload count too
+        existing = _existing_fingerprints(c, df['fingerprint'].unique().tolist())
+        is_duplicate = df['fingerprint'].isin(existing) | df['fingerprint'].duplicated()
+        duplicate_rows = list(df.loc[is_duplicate, TRANSACTION_COLUMNS].itertuples(index=False))
+        unique_rows = df.loc[~is_duplicate]
+        if not unique_rows.empty:
+            _insert_rows(c, unique_rows)
+            _bump_data_version(c)
+    return duplicate_rows
+
+def overwrite_duplicates(df):
+    df = _prepare_rows(df).drop_duplicates('fingerprint', keep='last')
+    fingerprints = [(fp,) for fp in df['fingerprint'].tolist()]
+    with write_transaction() as c:
+        _forget_rows(c, df['fingerprint'].tolist())
+        c.executemany('DELETE FROM transactions_fts WHERE rowid IN (SELECT id FROM transactions WHERE fingerprint=?)', fingerprints)
+        c.executemany("INSERT INTO changes (op, transaction_id) SELECT 'delete', id FROM transactions WHERE fingerprint=?", fingerprints)
+        c.executemany('DELETE FROM transactions WHERE fingerprint=?', fingerprints)
+        _insert_rows(c, df)
+        _bump_data_version(c)
+
+def clear_db():
+    with write_transaction() as c:
+        c.execute('DELETE FROM transactions')
+        c.execute('DELETE FROM transactions_fts')
+        c.execute('DELETE FROM group_stats')
+        c.execute('DELETE FROM recurring_schedules')
+        c.execute('DELETE FROM daily_balance')
+        for column in CATEGORICAL_COLUMNS:
+            c.execute(f'DELETE FROM lookup_{column}')
+        # Older changes describe rows that no longer exist; clients behind this point resync.
+        # Seqs and ids keep counting past the cleared ones, so existing cursors stay valid.
+        c.execute('DELETE FROM changes')
+        c.execute("INSERT INTO changes (op) VALUES ('clear')")
+        _bump_data_version(c)
+
+def fetch_transactions(start_date=None, end_date=None, transation_type=None, type_filter=None, anomalies_only=False, columns=FETCH_COLUMNS):
+    """Filtered transactions as a typed frame holding only the requested columns"""
+    conn = get_read_connection()
+    # Rows and the lookup tables that decode them must come from the same state:
+    # lookup ids restart after a clear
+    conn.execute('BEGIN')
+    c = conn.cursor()
+    clause, params = _filter_clause(start_date, end_date, transation_type, type_filter, anomalies_only)
+    c.execute(f'SELECT {_select_list(columns)} FROM transactions WHERE 1=1' + clause, params)
+    # Convert a chunk at a time so only one chunk of Python row tuples is alive at once
+    chunks = []
+    while True:
+        rows = c.fetchmany(EXPORT_CHUNK_SIZE)
+        if not rows:
+            break
+        chunks.append(_typed_columns(rows, columns))
+    if len(chunks) == 1:
+        data = chunks[0]
+    else:
+        chunks = chunks or [_typed_columns([], columns)]
+        data = {column: np.concatenate([chunk[column] for chunk in chunks]) for column in columns}
+    df = _columns_to_frame(c, data, columns)
+    conn.close()
+    return df
+
+def iter_transactions(start_date=None, end_date=None, transation_type=None, type_filter=None, anomalies_only=False, chunk_size=EXPORT_CHUNK_SIZE, columns=TRANSACTION_COLUMNS, arrow=False):
+    """
+    Yield the filtered transactions in chunks of at most chunk_size rows, as typed
+    DataFrames or, with arrow=True, as pyarrow RecordBatches with dictionary-encoded labels.
+    """
+    if arrow:
+        import pyarrow as pa
+        schema = arrow_schema(columns)
+    conn = get_read_connection()
+    try:
+        # One read transaction, so every chunk decodes against the lookups it was stored with
+        conn.execute('BEGIN')
+        c = conn.cursor()
+        clause, params = _filter_clause(start_date, end_date, transation_type, type_filter, anomalies_only)
+        c.execute(f'SELECT {_select_list(columns)} FROM transactions WHERE 1=1' + clause + ' ORDER BY date, id', params)
+        lookup_cursor = conn.cursor()
+        while True:
+            rows = c.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = _rows_to_frame(lookup_cursor, rows, columns)
+            yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False) if arrow else chunk
+    finally:
+        conn.close()
+
+def arrow_schema(columns=TRANSACTION_COLUMNS):
+    """Arrow types matching the frames fetch_transactions returns"""
+    import pyarrow as pa
+    types = {'date': pa.timestamp('ns'), 'description': pa.string()}
+    for column in FLOAT_COLUMNS:
+        types[column] = pa.float64()
+    for column in CATEGORICAL_COLUMNS:
+        types[column] = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([(column, types[column]) for column in columns])
+
+def _period_window(period, first_day, end_day, periods_per_year):
+    """
+    (gate, [(bucket, from, until), ...]) counting the same day offsets as first_day..end_day
+    inside period, in period itself, the period before and the period a year back
+    """
+    offset_from = first_day - period.start_time
+    offset_until = end_day - period.start_time + pd.Timedelta(days=1)
+    ranges = [
+        (bucket.start_time.strftime('%Y-%m-%d'), (bucket.start_time + offset_from).strftime('%Y-%m-%d'), (bucket.start_time + offset_until).strftime('%Y-%m-%d'))
+        for bucket in (period, period - 1, period - periods_per_year)
+    ]
+    return ranges[2][1], ranges
+
+def fetch_period_comparison(start_date=None, end_date=None, transation_type=None, type_filter=None, granularity='ME', anomalies_only=False):
+    """
+    Totals per period and transation_type in the range, each alongside the previous period
+    and the same period a year earlier, computed in one SQL pass with window frames.
+    Periods are labelled by their first day; missing comparisons are NaN. A first period
+    cut by the start date, or a last one still in progress, is marked partial: it and its
+    comparisons only count the same days of their periods, so part of a month isn't set
+    against whole ones.
+    """
+    period = PERIOD_START_SQL[granularity].format(column='transactions.date')
+    period_index, periods_per_year = PERIOD_INDEX_SQL[granularity]
+    # 'ME', 'QE', 'YE' name the matching pandas periods 'M', 'Q', 'Y'
+    freq = granularity.rstrip('E') or 'D'
+    today = pd.Timestamp.today().normalize()
+    as_of = min(pd.Timestamp(_normalize_date(end_date)), today) if end_date else today
+    last = as_of.to_period(freq)
+    first_period = None
+    lookback = None
+    # Each window is (period start, gate, ranges); unused ones stay all NULL and match nothing
+    first_window = last_window = (None, None, [(None, None, None)] * 3)
+    if start_date:
+        first_day = pd.Timestamp(_normalize_date(start_date))
+        first = first_day.to_period(freq)
+        first_period = first.start_time.strftime('%Y-%m-%d')
+        lookback = (first.start_time - pd.DateOffset(years=1)).strftime('%Y-%m-%d')
+        if first_day > first.start_time:
+            until = min(as_of, first.end_time.normalize()) if first == last else first.end_time.normalize()
+            first_window = (first_period, *_period_window(first, first_day, until, periods_per_year))
+    if granularity != 'D' and as_of < last.end_time.normalize():
+        since = first_day if start_date and first == last else last.start_time
+        last_window = (last.start_time.strftime('%Y-%m-%d'), *_period_window(last, since, as_of, periods_per_year))
+    if first_window[0] is not None and first_window[0] == last_window[0]:
+        # One period cut at both ends: the last window already counts the same days
+        first_window = (None, None, [(None, None, None)] * 3)
+    window_sum = f"""SUM(CASE WHEN transactions.date >= ? THEN CASE {period}
+                    WHEN ? THEN transactions.date >= ? AND transactions.date < ?
+                    WHEN ? THEN transactions.date >= ? AND transactions.date < ?
+                    WHEN ? THEN transactions.date >= ? AND transactions.date < ?
+                    ELSE 0 END ELSE 0 END * transactions.amount)"""
+    window_columns = []
+    window_params = []
+    for _, gate, ranges in (first_window, last_window):
+        # An unused window costs nothing per row
+        window_columns.append(window_sum if gate is not None else '0')
+        if gate is not None:
+            window_params += [gate] + [bound for bucket_range in ranges for bound in bucket_range]
+    # Rows from the year before the range are read only to supply comparisons
+    clause, params = _filter_clause(lookback, end_date, transation_type, type_filter, anomalies_only)
+    order = period_index.format(column='period')
+    previous_frame = 'RANGE BETWEEN 1 PRECEDING AND 1 PRECEDING'
+    year_ago_frame = f'RANGE BETWEEN {periods_per_year} PRECEDING AND {periods_per_year} PRECEDING'
+    conn = get_read_connection()
+    c = conn.cursor()
+    c.execute(f"""
+        WITH buckets AS (
+            SELECT {period} AS period, COALESCE(lookup.name, '') AS category, SUM(transactions.amount) AS total,
+                {window_columns[0]} AS first_days,
+                {window_columns[1]} AS last_days
+            FROM transactions LEFT JOIN lookup_transation_type lookup ON lookup.id = transactions.transation_type_id
+            WHERE transactions.date IS NOT NULL AND transactions.amount IS NOT NULL{clause}
+            GROUP BY 1, 2
+        ), compared AS (
+            SELECT period, category, total, first_days, last_days,
+                SUM(total) OVER (PARTITION BY category ORDER BY {order} {previous_frame}) AS previous_total,
+                SUM(total) OVER (PARTITION BY category ORDER BY {order} {year_ago_frame}) AS year_ago_total,
+                SUM(first_days) OVER (PARTITION BY category ORDER BY {order} {previous_frame}) AS previous_first_days,
+                SUM(first_days) OVER (PARTITION BY category ORDER BY {order} {year_ago_frame}) AS year_ago_first_days,
+                SUM(last_days) OVER (PARTITION BY category ORDER BY {order} {previous_frame}) AS previous_last_days,
+                SUM(last_days) OVER (PARTITION BY category ORDER BY {order} {year_ago_frame}) AS year_ago_last_days
+            FROM buckets
+        )
+        SELECT period, category,
+            CASE period WHEN ? THEN last_days WHEN ? THEN first_days ELSE total END,
+            CASE period WHEN ? THEN previous_last_days WHEN ? THEN previous_first_days ELSE previous_total END,
+            CASE period WHEN ? THEN year_ago_last_days WHEN ? THEN year_ago_first_days ELSE year_ago_total END,
+            COALESCE(period IN (?, ?), 0)
+        FROM compared
+        WHERE period >= ? ORDER BY period, category""",
+        window_params + params + [last_window[0], first_window[0]] * 4 + [first_period or ''])
+    comparison = pd.DataFrame(c.fetchall(), columns=['period', 'category', 'total', 'previous_total', 'year_ago_total', 'partial'])
     conn.close()
-    columns = ['transation_type', 'amount', 'type', 'description', 'date', 'title']
-    return pd.DataFrame(rows, columns=columns)
+    comparison['period'] = pd.to_datetime(comparison['period'])
+    return comparison.astype({'total': float, 'previous_total': float, 'year_ago_total': float, 'partial': bool})
+
+def _fts_query(text):
+    # Quote every term so user punctuation can't break FTS5 syntax; trailing * matches prefixes
+    terms = text.split()
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+def search_transactions(text, start_date=None, end_date=None, transation_type=None, type_filter=None, anomalies_only=False, page=0, page_size=10):
+    """
+    Full-text search over description and title, combined with the usual filters.
+    Returns one page of rows and the number of matches, counted up to
+    SEARCH_RANK_LIMIT + 1. Up to the limit rows are ordered by relevance; broader
+    searches list the most recently imported matches first.
+    """
+    match = _fts_query(text or '')
+    if not match:
+        return pd.DataFrame(columns=TRANSACTION_COLUMNS), 0
+    conn = get_read_connection()
+    # Count, page and label lookups read one consistent state
+    conn.execute('BEGIN')
+    c = conn.cursor()
+    clause, params = _filter_clause(start_date, end_date, transation_type, type_filter, anomalies_only)
+    source = 'FROM transactions_fts JOIN transactions ON transactions.id = transactions_fts.rowid WHERE transactions_fts MATCH ?' + clause
+    c.execute(f'SELECT COUNT(*) FROM (SELECT 1 {source} LIMIT ?)', [match] + params + [SEARCH_RANK_LIMIT + 1])
+    total = c.fetchone()[0]
+    # Past the limit, rowid (import order, ids only grow) is walked without sorting the matches
+    order = 'transactions_fts.rank' if total <= SEARCH_RANK_LIMIT else 'transactions_fts.rowid DESC'
+    c.execute(f'SELECT {_select_list(TRANSACTION_COLUMNS)} {source} ORDER BY {order} LIMIT ? OFFSET ?', [match] + params + [page_size, page * page_size])
+    df = _rows_to_frame(c, c.fetchall())
+    conn.close()
+    return df, total
+
+init_db()
 
 def send_email_notification(emails, subject, body, smtp_server="smtp.gmail.com", smtp_port=587, sender_email=None, sender_password=None):
     """
@@ -274,6 +1222,7 @@ def serve_layout():
                 dbc.Col([
                     html.Label("Type", className="fw-bold mb-1"),
                     dcc.Dropdown(id='filter-type', options=[], multi=True, disabled=True, placeholder="Filter by type"),
+                    dbc.Switch(id='filter-anomalies', label="Only unusual transactions", value=False, className="mt-2 mb-0"),
                 ], xs=12, sm=6, md=3, lg=3, xl=3, className="mb-2"),
                 dbc.Col([
                     html.Label("Trend Granularity", className="fw-bold mb-1"),
@@ -282,7 +1231,7 @@ def serve_layout():
                         options=[
                             {'label': 'Per Day', 'value': 'D'},
                             {'label': 'Per Month', 'value': 'ME'},
-                            {'label': 'Per Quarter', 'value': 'Q'},
+                            {'label': 'Per Quarter', 'value': 'QE'},
                             {'label': 'Per Year', 'value': 'YE'}
                         ],
                         value='ME',
@@ -314,7 +1263,8 @@ def serve_layout():
                                     "Upload Excel"
                                 ], color="primary", className="w-100"),
                                 style={'display': 'inline-block', 'width': '100%'},
-                                multiple=False
+                                accept='.xlsx,.xls,.zip',
+                                multiple=True
                             ), width="auto", className="me-2"
                         ),
                         dbc.Col(
@@ -324,6 +1274,15 @@ def serve_layout():
                             ], id="btn-download-template", color="warning", className="w-100"),
                             width="auto", className="me-2"
                         ),
+                        dbc.Col(
+                            dbc.DropdownMenu([
+                                dbc.DropdownMenuItem("CSV", id="export-csv", href="/export/transactions.csv", external_link=True),
+                                dbc.DropdownMenuItem("CSV (gzip)", id="export-csv-gz", href="/export/transactions.csv?gzip=1", external_link=True),
+                                dbc.DropdownMenuItem("Excel", id="export-xlsx", href="/export/transactions.xlsx", external_link=True),
+                                dbc.DropdownMenuItem("Parquet", id="export-parquet", href="/export/transactions.parquet", external_link=True),
+                            ], label="Export", color="success", className="w-100"),
+                            width="auto", className="me-2"
+                        ),
                         dbc.Col(
                             dbc.Button("Clear Database", id="btn-clear-db", color="danger", className="w-100"),
                             width="auto", className="me-2"
@@ -344,6 +1303,7 @@ def serve_layout():
             className="mb-4 p-3 shadow-sm",
             style={"background": "#f8f9fa", "borderRadius": "16px"}
         ),
+        html.Div(id='upload-status', className="small mb-3", style={"maxWidth": "90vw", "margin": "0 auto"}),
         # Restore summary cards row
         dbc.Row([
             dbc.Col(html.Div(id="card-highest-income", n_clicks=0), width=2, className="d-flex flex-column align-items-stretch p-0 h-100", style={"marginRight": "18px", "cursor": "pointer"}),
@@ -367,6 +1327,29 @@ def serve_layout():
                 ], style=card_style)
             ], width=10, className="offset-md-1")
         ]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4("Search Transactions", className="mt-2 text-center"),
+                        html.P("Find transactions by words in their description or title. Results respect the filters above and are sorted by relevance.", className="text-center"),
+                        dbc.Input(id='search-text', type="search", placeholder="Search descriptions and titles", debounce=True, className="mb-2"),
+                        html.Div(id='search-summary', className="text-muted small mb-2"),
+                        dash_table.DataTable(
+                            id='search-table',
+                            columns=[{"name": i, "id": i} for i in TRANSACTION_COLUMNS],
+                            data=[],
+                            page_current=0,
+                            page_size=10,
+                            page_count=0,
+                            page_action='custom',
+                            style_table={'overflowX': 'auto'},
+                            style_cell={'textAlign': 'left'},
+                        )
+                    ])
+                ], style=card_style)
+            ], width=10, className="offset-md-1")
+        ]),
         dbc.Row([
             dbc.Col([
                 dbc.Card([
@@ -378,6 +1361,42 @@ def serve_layout():
                 ], style=card_style)
             ], width=10, className="offset-md-1")
         ]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4("Period Comparison", className="mt-2 text-center"),
+                        html.P("Totals for the latest period in your selection next to the period before it and the same period a year earlier. The period length follows the trend granularity.", className="text-center"),
+                        html.Div(id='comparison-summary', className="text-muted small mb-2 text-center"),
+                        dash_table.DataTable(
+                            id='comparison-table',
+                            columns=[
+                                {"name": "Category", "id": "category"},
+                                {"name": "This period", "id": "total"},
+                                {"name": "Previous period", "id": "previous_total"},
+                                {"name": "Change", "id": "previous_change"},
+                                {"name": "Same period last year", "id": "year_ago_total"},
+                                {"name": "Change", "id": "year_ago_change"},
+                            ],
+                            data=[],
+                            style_table={'overflowX': 'auto'},
+                            style_cell={'textAlign': 'left'},
+                        )
+                    ])
+                ], style=card_style)
+            ], width=10, className="offset-md-1")
+        ]),
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H4("Running Balance", className="mt-2 text-center"),
+                        html.P("This chart shows your net balance (income minus everything else) at the end of each day, across all transactions regardless of the type filters.", className="text-center"),
+                        dcc.Graph(id='balance-graph', config={'displayModeBar': False}, className="mb-3")
+                    ])
+                ], style=card_style)
+            ], width=10, className="offset-md-1")
+        ]),
         dbc.Row([
             dbc.Col([
                 dbc.Card([
@@ -469,247 +1488,131 @@ def serve_layout():
 
 app.layout = serve_layout
 
-def parse_contents(contents, filename):
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
+# Spreadsheets in one upload are parsed in parallel worker processes
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', min(4, os.cpu_count() or 1)))
+# Archives that would unpack past this are refused, so a hostile zip can't exhaust memory
+UPLOAD_MAX_UNZIPPED_BYTES = 200 * 1024 * 1024
+_upload_executor = None
+_upload_executor_lock = threading.Lock()
+
+def _reset_upload_executor():
+    # A pool's processes belong to the process that started them
+    global _upload_executor
+    _upload_executor = None
+
+os.register_at_fork(after_in_child=_reset_upload_executor)
+
+def _get_upload_executor():
+    """The shared parsing pool, or None where worker processes can't start cleanly"""
+    global _upload_executor
+    with _upload_executor_lock:
+        if _upload_executor is None:
+            import multiprocessing
+            # Forking a threaded server can copy a lock mid-use into the child, and spawn
+            # would re-run this module in every worker. A fork server that has imported
+            # only upload_parsing avoids both; without one, uploads are parsed in-process.
+            # Workers still re-run the main script, so neither is used under `python app.py`.
+            if __name__ == '__main__' or 'forkserver' not in multiprocessing.get_all_start_methods():
+                return None
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['upload_parsing'])
+            _upload_executor = ProcessPoolExecutor(max_workers=UPLOAD_WORKERS, mp_context=context)
+        return _upload_executor
+
+def _discard_upload_executor(executor):
+    global _upload_executor
+    with _upload_executor_lock:
+        if _upload_executor is executor:
+            _upload_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _parse_in_pool(readable):
+    """
+    parse_spreadsheet over (name, bytes) pairs in the worker pool. A crashed worker
+    breaks the whole pool, so it is replaced and the batch retried once; a file that
+    kills the parser twice is reported instead of taking the web worker down with it.
+    """
+    for attempt in range(2):
+        executor = _get_upload_executor()
+        if executor is None:
+            return [parse_spreadsheet(name, data, TRANSACTION_COLUMNS) for name, data in readable]
+        try:
+            return list(executor.map(parse_spreadsheet, *zip(*readable), [TRANSACTION_COLUMNS] * len(readable)))
+        except BrokenProcessPool:
+            _discard_upload_executor(executor)
+    return [(name, None, "could not be read (the parser stopped unexpectedly)") for name, data in readable]
+
+def _expand_upload(filename, data):
+    """(name, bytes, error) for each file in an upload; zip archives open one level deep"""
+    if not filename.lower().endswith('.zip'):
+        return [(filename, data, None)]
     try:
-        if 'xls' in filename:
-            df = pd.read_excel(io.BytesIO(decoded))
-        else:
-            return None
-    except Exception as e:
-        print(e)
-        return None
-    return df
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir() and not info.filename.startswith('__MACOSX/')]
+            if sum(info.file_size for info in members) > UPLOAD_MAX_UNZIPPED_BYTES:
+                return [(filename, None, "archive is too large once unpacked")]
+            if not members:
+                return [(filename, None, "archive is empty")]
+            files = []
+            for info in members:
+                name = f"{filename}/{info.filename}"
+                try:
+                    files.append((name, archive.read(info), None))
+                except (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, EOFError) as e:
+                    # Corrupt, encrypted or unsupported members fail on their own; the rest still load
+                    files.append((name, None, "is password protected" if info.flag_bits & 0x1 else f"could not be unpacked ({e})"))
+            return files
+    except zipfile.BadZipFile:
+        return [(filename, None, "not a valid zip archive")]
 
-@app.callback(
-    [Output('filter-transation_type', 'options'),
-     Output('filter-type', 'options'),
-     Output('filter-transation_type', 'disabled'),
-     Output('filter-type', 'disabled'),
-     Output('trend-granularity', 'disabled'),
-     Output('date-range', 'disabled'),
-     Output('card-highest-income', 'children'),
-     Output('card-highest-expense', 'children'),
-     Output('card-total', 'children'),
-     Output('card-profitloss', 'children'),
-     Output('card-frequent', 'children'),
-     Output('table-container', 'children'),
-     Output('trend-graph', 'figure'),
-     Output('projection-graph', 'figure'),
-     Output('all-data-graph', 'figure'),
-     Output('modal-clear-db', 'is_open'),
-     Output('modal-duplicates', 'is_open'),
-     Output('duplicate-list', 'children')],
-    [Input('upload-data', 'contents'),
-     Input('trend-granularity', 'value'),
-     Input('filter-transation_type', 'value'),
-     Input('filter-type', 'value'),
-     Input('date-range', 'start_date'),
-     Input('date-range', 'end_date'),
-     Input('btn-clear-db', 'n_clicks'),
-     Input('btn-confirm-clear', 'n_clicks'),
-     Input('btn-cancel-clear', 'n_clicks'),
-     Input('btn-overwrite', 'n_clicks'),
-     Input('btn-cancel-import', 'n_clicks')],
-    [State('upload-data', 'filename'),
-     State('modal-clear-db', 'is_open'),
-     State('modal-duplicates', 'is_open'),
-     State('upload-data', 'contents')]
-)
-def update_output(contents, granularity, transation_type, type_filter, start_date, end_date, btn_clear_db, btn_confirm_clear, btn_cancel_clear, btn_overwrite, btn_cancel_import, filename, modal_clear_open, modal_dup_open, last_upload_contents):
-    import flask
-    from dash import callback_context
-    args = flask.request.args if flask.has_request_context() else {}
-    summary_card_style = SUMMARY_CARD_STYLE
-    ctx = callback_context
-    triggered = ctx.triggered[0]['prop_id'] if ctx.triggered else ''
-    # Handle clear DB modal logic
-    if triggered.startswith('btn-clear-db'):
-        return [dash.no_update] * 15 + [True, False, None]
-    if triggered.startswith('btn-cancel-clear'):
-        return [dash.no_update] * 15 + [False, False, None]
-    if triggered.startswith('btn-confirm-clear'):
-        clear_db()
-        return [[], [], True, True, True, True, None, None, None, None, None, None, go.Figure(), go.Figure(), go.Figure(), False, False, None]
-    # Handle duplicate modal logic
-    if triggered.startswith('btn-cancel-import'):
-        return [dash.no_update] * 15 + [False, False, None]
-    if triggered.startswith('btn-overwrite'):
-        # Overwrite duplicates with last uploaded data
-        if last_upload_contents and filename:
-            df_upload = parse_contents(last_upload_contents, filename)
-            if df_upload is not None and set(['transation_type', 'amount', 'type', 'description', 'date', 'title']).issubset(df_upload.columns):
-                df_upload['date'] = pd.to_datetime(df_upload['date'])
-                overwrite_duplicates(df_upload)
-        # After overwrite, fetch and show data
-        df = fetch_transactions(start_date, end_date, transation_type, type_filter)
-        if df is None or df.empty:
-            return [[], [], True, True, True, True, None, None, None, None, None, html.Div("No data available. Upload a file to get started."), go.Figure(), go.Figure(), go.Figure(), False, False, None]
-        df['date'] = pd.to_datetime(df['date'])
-        # Prepare filter options
-        transation_type_options = [{'label': str(val), 'value': val} for val in sorted(df['transation_type'].dropna().unique())]
-        type_options = [{'label': str(val), 'value': val} for val in sorted(df['type'].dropna().unique())]
-        # --- Summary Analysis ---
-        income_df = df[df['transation_type'] == 'income']
-        expense_df = df[df['transation_type'] == 'expense']
-        highest_income = income_df['amount'].max() if not income_df.empty else 0
-        highest_income_row = income_df.loc[income_df['amount'].idxmax()] if not income_df.empty else None
-        highest_expense = expense_df['amount'].max() if not expense_df.empty else 0
-        highest_expense_row = expense_df.loc[expense_df['amount'].idxmax()] if not expense_df.empty else None
-        accent_style_income = {"width": "16px", "height": "16px", "borderRadius": "50%", "background": "#198754", "display": "inline-block", "marginRight": "8px"}
-        accent_style_expense = {"width": "16px", "height": "16px", "borderRadius": "50%", "background": "#dc3545", "display": "inline-block", "marginRight": "8px"}
-        accent_style_profit = {"width": "32px", "height": "32px", "borderRadius": "50%", "background": "#ffc107", "display": "inline-block", "marginRight": "12px"}
-        accent_style_freq = {"width": "32px", "height": "32px", "borderRadius": "50%", "background": "#0dcaf0", "display": "inline-block", "marginRight": "12px"}
-        card_highest_income = html.Div([
-            html.Div([
-                html.Div([
-                    html.Span("", style={**accent_style_income, "verticalAlign": "middle"}),
-                    html.Span("Highest Income", className="small text-uppercase text-muted ms-1", style={"verticalAlign": "middle", "fontSize": "0.8rem"}),
-                ], className="d-flex align-items-center justify-content-center w-100", style={"marginBottom": "4px"}),
-                html.Div(f"₹{highest_income:,.2f}" if highest_income else "-", className="fw-bold text-center", style={"color": "#198754", "wordBreak": "break-all", "fontSize": "1.1rem", "marginBottom": "2px"}),
-                html.Small(highest_income_row['title'] if highest_income_row is not None and 'title' in highest_income_row else "", className="text-muted text-center w-100", style={"fontSize": "0.75rem", "fontStyle": "italic"}),
-                html.Small(highest_income_row['description'] if highest_income_row is not None else "", className="text-muted text-center w-100", style={"fontSize": "0.75rem"}),
-            ], style=CARD_CONTENT_STYLE)
-        ], style={**SUMMARY_CARD_STYLE, "width": "100%", "height": "100%"})
-        card_highest_expense = html.Div([
-            html.Div([
-                html.Div([
-                    html.Span("", style={**accent_style_expense, "verticalAlign": "middle"}),
-                    html.Span("Highest Expense", className="small text-uppercase text-muted ms-1", style={"verticalAlign": "middle", "fontSize": "0.8rem"}),
-                ], className="d-flex align-items-center justify-content-center w-100", style={"marginBottom": "4px"}),
-                html.Div(f"₹{highest_expense:,.2f}" if highest_expense else "-", className="fw-bold text-center", style={"color": "#dc3545", "wordBreak": "break-all", "fontSize": "1.1rem", "marginBottom": "2px"}),
-                html.Small(highest_expense_row['title'] if highest_expense_row is not None and 'title' in highest_expense_row else "", className="text-muted text-center w-100", style={"fontSize": "0.75rem", "fontStyle": "italic"}),
-                html.Small(highest_expense_row['description'] if highest_expense_row is not None else "", className="text-muted text-center w-100", style={"fontSize": "0.75rem"}),
-            ], style=CARD_CONTENT_STYLE)
-        ], style={**SUMMARY_CARD_STYLE, "width": "100%", "height": "100%"})
-        total_income = income_df['amount'].sum() if not income_df.empty else 0
-        total_expense = expense_df['amount'].sum() if not expense_df.empty else 0
-        card_total = html.Div([
-            html.Div([
-                html.Div([
-                    html.Span("", style={**accent_style_income, "verticalAlign": "middle"}),
-                    html.Span("Total Income", className="small text-uppercase text-muted ms-1", style={"verticalAlign": "middle", "fontSize": "0.8rem"}),
-                ], className="d-flex align-items-center justify-content-center w-100", style={"marginBottom": "4px"}),
-                html.Div(f"₹{total_income:,.2f}", className="fw-bold text-center", style={"color": "#198754", "wordBreak": "break-all", "fontSize": "1.1rem", "marginBottom": "2px"}),
-                html.Hr(style={"borderColor": "#eee", "margin": "8px 0", "width": "100%"}),
-                html.Div([
-                    html.Span("", style={**accent_style_expense, "verticalAlign": "middle"}),
-                    html.Span("Total Expense", className="small text-uppercase text-muted ms-1", style={"verticalAlign": "middle", "fontSize": "0.8rem"}),
-                ], className="d-flex align-items-center justify-content-center w-100", style={"marginBottom": "4px", "marginTop": "4px"}),
-                html.Div(f"₹{total_expense:,.2f}", className="fw-bold text-center", style={"color": "#dc3545", "wordBreak": "break-all", "fontSize": "1.1rem", "marginBottom": "2px"}),
-            ], style=CARD_CONTENT_STYLE)
-        ], style={**SUMMARY_CARD_STYLE, "width": "100%", "height": "100%"})
-        profit = total_income - total_expense
-        card_profitloss = html.Div([
-            html.Div([
-                html.Div([
-                    html.Span("", style={**accent_style_profit, "verticalAlign": "middle"}),
-                    html.Span("Profit / Loss", className="small text-uppercase text-muted ms-1", style={"verticalAlign": "middle", "fontSize": "0.8rem"}),
-                ], className="d-flex align-items-center justify-content-center w-100", style={"marginBottom": "4px"}),
-                html.Div(f"₹{profit:,.2f}", className="fw-bold text-center", style={"color": ("#198754" if profit >= 0 else "#dc3545"), "wordBreak": "break-all", "fontSize": "1.1rem", "marginBottom": "2px"}),
-                html.Small("(Income - Expense)", className="text-muted text-center w-100", style={"fontSize": "0.75rem", "marginBottom": "8px"}),
-            ], style=CARD_CONTENT_STYLE)
-        ], style={**SUMMARY_CARD_STYLE, "width": "100%", "height": "100%"})
-        freq_type = df['transation_type'].mode()[0] if not df.empty else "-"
-        freq_count = df['transation_type'].value_counts().max() if not df.empty else 0
-        card_frequent = html.Div([
-            html.Div([
-                html.Div([
-                    html.Span("", style={**accent_style_freq, "verticalAlign": "middle"}),
-                    html.Span("Most Frequent Type", className="small text-uppercase text-muted ms-1", style={"verticalAlign": "middle", "fontSize": "0.8rem"}),
-                ], className="d-flex align-items-center justify-content-center w-100", style={"marginBottom": "4px"}),
-                html.Div(freq_type.title(), className="fw-bold text-center", style={"color": "#0dcaf0", "wordBreak": "break-all", "fontSize": "1.1rem", "marginBottom": "2px"}),
-                html.Small(f"{freq_count} times", className="text-muted text-center w-100", style={"fontSize": "0.75rem"}),
-            ], style=CARD_CONTENT_STYLE)
-        ], style={**SUMMARY_CARD_STYLE, "width": "100%", "height": "100%"})
-        
-        # Filters
-        if transation_type:
-            df = df[df['transation_type'].isin(transation_type)]
-        if type_filter:
-            df = df[df['type'].isin(type_filter)]
-        
-        # Table
-        table = dash_table.DataTable(
-            columns=[{"name": i, "id": i} for i in df.columns],
-            data=df.to_dict('records'),
-            page_size=10,
-            style_table={'overflowX': 'auto'},
-            style_cell={'textAlign': 'left'},
-        )
-        
-        # Trend Analysis
-        df_trend = df.copy()
-        df_trend['date'] = pd.to_datetime(df_trend['date'])
-        df_trend = df_trend.set_index('date').sort_index()
-        trend = df_trend.resample(granularity)['amount'].sum().reset_index()
-        trend_fig = px.line(
-            trend,
-            x='date',
-            y='amount',
-            title='How Your Total Amount Changes Over Time',
-            labels={'date': 'Date', 'amount': 'Total Amount'}
-        )
-        trend_fig.update_layout(showlegend=False)
-        
-        # Projection (bar + line combo)
-        if len(trend) > 1:
-            trend['ordinal_date'] = trend['date'].map(datetime.toordinal)
-            X = trend[['ordinal_date']]
-            y = trend['amount']
-            model = LinearRegression()
-            model.fit(X, y)
-            freq = granularity
-            future_dates = pd.date_range(trend['date'].max(), periods=6, freq=freq)[1:]
-            future_ordinals = future_dates.map(datetime.toordinal).values.reshape(-1, 1)
-            future_preds = model.predict(future_ordinals)
-            projection_fig = go.Figure()
-            projection_fig.add_trace(go.Bar(x=trend['date'], y=trend['amount'], name='Actual', marker_color='#198754'))
-            projection_fig.add_trace(go.Scatter(x=future_dates, y=future_preds, mode='lines+markers', name='Projection', line=dict(color='#ffc107', dash='solid')))
-            projection_fig.update_layout(
-                title='Predicted Future Amounts',
-                xaxis_title='Date',
-                yaxis_title='Predicted Total Amount',
-                legend_title_text='Legend',
-                barmode='group'
-            )
+def parse_uploads(contents, filenames):
+    """
+    Parse every file in an upload, zip archives included, in parallel when there is
+    more than one. Returns all valid rows merged into one batch (None if no file was
+    usable) and a per-file status list of (filename, row count, error).
+    """
+    if isinstance(contents, str):
+        contents, filenames = [contents], [filenames]
+    files = []
+    for content, filename in zip(contents, filenames):
+        files.extend(_expand_upload(filename, base64.b64decode(content.split(',', 1)[1])))
+    readable = [(name, data) for name, data, error in files if error is None]
+    if len(readable) > 1:
+        parsed = iter(_parse_in_pool(readable))
+    else:
+        parsed = iter([parse_spreadsheet(name, data, TRANSACTION_COLUMNS) for name, data in readable])
+    frames = []
+    statuses = []
+    for name, data, error in files:
+        rows = 0
+        if error is None:
+            name, df, error = next(parsed)
+            if df is not None:
+                frames.append(df)
+                rows = len(df)
+        statuses.append((name, rows, error))
+    merged = pd.concat(frames, ignore_index=True) if frames else None
+    return merged, statuses
+
+def upload_status(statuses):
+    """One line per uploaded file: rows read, or why it was skipped"""
+    items = []
+    for name, rows, error in statuses:
+        if error:
+            items.append(html.Li([html.I(className="bi bi-x-circle text-danger me-1"), f"{name}: {error}"]))
         else:
-            projection_fig = go.Figure()
-        
-        all_data_fig = px.scatter(
-            df,
-            x='date',
-            y='amount',
-            color='transation_type',
-            symbol='type',
-            hover_data=['description'],
-            title='All Transactions by Date and Amount',
-            labels={'date': 'Date', 'amount': 'Amount', 'transation_type': 'Transaction Type', 'type': 'Recurring/One-time'}
-        )
-        all_data_fig.update_layout(legend_title_text='Transaction Type')
-        
-        return [transation_type_options, type_options, False, False, False, False, card_highest_income, card_highest_expense, card_total, card_profitloss, card_frequent, table, trend_fig, projection_fig, all_data_fig, False, False, None]
-    # If a file is uploaded, check for duplicates and show modal if needed
-    if contents is not None and triggered.startswith('upload-data'):
-        df_upload = parse_contents(contents, filename)
-        if df_upload is not None and set(['transation_type', 'amount', 'type', 'description', 'date', 'title']).issubset(df_upload.columns):
-            df_upload['date'] = pd.to_datetime(df_upload['date'])
-            duplicate_rows = insert_transactions(df_upload)
-            if duplicate_rows:
-                # Show modal with duplicate details
-                dup_list = html.Ul([
-                    html.Li(', '.join(str(x) for x in row)) for row in duplicate_rows[:10]
-                ] + ([html.Li('...and more') if len(duplicate_rows) > 10 else None]))
-                return [dash.no_update] * 15 + [False, True, dup_list]
-    # Always fetch from DB for display
-    df = fetch_transactions(start_date, end_date, transation_type, type_filter)
+            items.append(html.Li([html.I(className="bi bi-check-circle text-success me-1"), f"{name}: {rows} rows"]))
+    return html.Ul(items, className="list-unstyled mb-0")
+
+def build_dashboard(start_date, end_date, transation_type, type_filter, granularity, anomalies_only=False):
+    """Cards, table and figures for one filter selection, in update_output's output order"""
+    df = fetch_transactions(start_date, end_date, transation_type, type_filter, anomalies_only)
     if df is None or df.empty:
-        return [[], [], True, True, True, True, None, None, None, None, None, html.Div("No data available. Upload a file to get started."), go.Figure(), go.Figure(), go.Figure(), False, False, None]
-    df['date'] = pd.to_datetime(df['date'])
+        return [[], [], True, True, True, True, None, None, None, None, None, html.Div("No data available. Upload a file to get started."), go.Figure(), go.Figure(), go.Figure(), [], "No data in the selected range."]
     # Prepare filter options
-    transation_type_options = [{'label': str(val), 'value': val} for val in sorted(df['transation_type'].dropna().unique())]
-    type_options = [{'label': str(val), 'value': val} for val in sorted(df['type'].dropna().unique())]
+    label_options = fetch_label_options()
+    transation_type_options = label_options['transation_type']
+    type_options = label_options['type']
     # --- Summary Analysis ---
     # Highest Income & Expense
     income_df = df[df['transation_type'] == 'income']
@@ -792,16 +1695,14 @@ def update_output(contents, granularity, transation_type, type_filter, start_dat
     ], style={**SUMMARY_CARD_STYLE, "width": "100%", "height": "100%"})
     # Table
     table = dash_table.DataTable(
-        columns=[{"name": i, "id": i} for i in df.columns],
-        data=df.to_dict('records'),
+        columns=[{"name": i, "id": i} for i in TRANSACTION_COLUMNS],
+        data=df[TRANSACTION_COLUMNS].to_dict('records'),
         page_size=10,
         style_table={'overflowX': 'auto'},
         style_cell={'textAlign': 'left'},
     )
     # Trend Analysis
-    df_trend = df.copy()
-    df_trend['date'] = pd.to_datetime(df_trend['date'])
-    df_trend = df_trend.set_index('date').sort_index()
+    df_trend = df.set_index('date').sort_index()
     trend = df_trend.resample(granularity)['amount'].sum().reset_index()
     trend_fig = px.line(
         trend,
@@ -811,6 +1712,22 @@ def update_output(contents, granularity, transation_type, type_filter, start_dat
         labels={'date': 'Date', 'amount': 'Total Amount'}
     )
     trend_fig.update_layout(showlegend=False)
+    # One comparison feeds both the year-ago overlay and the comparison card
+    comparison = fetch_period_comparison(start_date, end_date, transation_type, type_filter, granularity, anomalies_only)
+    comparison_rows, comparison_summary = build_comparison_table(comparison, granularity)
+    year_ago = comparison.groupby('period')['year_ago_total'].sum(min_count=1).dropna()
+    # Comparisons are keyed by period start; the resampled trend plots each period at its last day
+    year_ago.index = year_ago.index.to_period(granularity.rstrip('E') or 'D').end_time.normalize()
+    if not year_ago.empty:
+        trend_fig.update_traces(name='Selected range', showlegend=True)
+        trend_fig.add_trace(go.Scatter(
+            x=year_ago.index,
+            y=year_ago.values,
+            mode='lines',
+            name='Same period last year',
+            line=dict(color='#adb5bd', dash='dot')
+        ))
+        trend_fig.update_layout(showlegend=True)
     # Projection (bar + line combo)
     if len(trend) > 1:
         trend['ordinal_date'] = trend['date'].map(datetime.toordinal)
@@ -825,6 +1742,12 @@ def update_output(contents, granularity, transation_type, type_filter, start_dat
         projection_fig = go.Figure()
         projection_fig.add_trace(go.Bar(x=trend['date'], y=trend['amount'], name='Actual', marker_color='#198754'))
         projection_fig.add_trace(go.Scatter(x=future_dates, y=future_preds, mode='lines+markers', name='Projection', line=dict(color='#ffc107', dash='solid')))
+        # Payments the detected recurring schedules expect over the projection window
+        upcoming = fetch_upcoming_payments(pd.Timestamp(df['date'].max()) + timedelta(days=1), future_dates.max(), transation_type)
+        if not upcoming.empty:
+            scheduled = upcoming.set_index('date').sort_index().resample(granularity)['amount'].sum()
+            scheduled = scheduled[scheduled != 0]
+            projection_fig.add_trace(go.Bar(x=scheduled.index, y=scheduled.values, name='Scheduled recurring', marker_color='#0dcaf0'))
         projection_fig.update_layout(
             title='Predicted Future Amounts',
             xaxis_title='Date',
@@ -844,8 +1767,294 @@ def update_output(contents, granularity, transation_type, type_filter, start_dat
         title='All Transactions by Date and Amount',
         labels={'date': 'Date', 'amount': 'Amount', 'transation_type': 'Transaction Type', 'type': 'Recurring/One-time'}
     )
+    # Ring the transactions that stand out from their group's history
+    flagged = df[df['anomaly_score'] >= ANOMALY_THRESHOLD]
+    if not flagged.empty:
+        all_data_fig.add_trace(go.Scatter(
+            x=flagged['date'],
+            y=flagged['amount'],
+            mode='markers',
+            name='Unusual',
+            marker=dict(size=16, color='rgba(0,0,0,0)', line=dict(color='#dc3545', width=2)),
+            customdata=np.stack([flagged['title'].astype(str), flagged['anomaly_score'].round(1)], axis=-1),
+            hovertemplate='Unusual: %{customdata[0]}<br>Amount %{y:,.2f}<br>%{customdata[1]}× usual spread<extra></extra>'
+        ))
     all_data_fig.update_layout(legend_title_text='Transaction Type')
-    return [transation_type_options, type_options, False, False, False, False, card_highest_income, card_highest_expense, card_total, card_profitloss, card_frequent, table, trend_fig, projection_fig, all_data_fig, False, False, None]
+    return [transation_type_options, type_options, False, False, False, False, card_highest_income, card_highest_expense, card_total, card_profitloss, card_frequent, table, trend_fig, projection_fig, all_data_fig, comparison_rows, comparison_summary]
+
+# Per-worker cache of built dashboards. Keys include the data version, so any write
+# makes older entries unreachable and they simply age out of the LRU.
+DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', 16))
+PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS', 2))
+# Prefetches beyond this are dropped rather than queued behind stale navigation
+PREFETCH_MAX_PENDING = PREFETCH_WORKERS * 2
+_dashboard_cache = OrderedDict()
+_dashboard_cache_lock = threading.Lock()
+_prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='prefetch')
+_prefetch_pending = 0
+
+def _reset_prefetch_executor():
+    # Worker threads don't survive fork; give each forked worker its own pool
+    global _prefetch_executor, _prefetch_pending
+    _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='prefetch')
+    _prefetch_pending = 0
+
+os.register_at_fork(after_in_child=_reset_prefetch_executor)
+
+def get_dashboard(start_date, end_date, transation_type, type_filter, granularity, anomalies_only=False):
+    """build_dashboard behind the cache; concurrent requests for one view share a single build"""
+    key = (
+        get_data_version(),
+        _normalize_date(start_date),
+        _normalize_date(end_date),
+        tuple(sorted(transation_type or [])),
+        tuple(sorted(type_filter or [])),
+        granularity,
+        bool(anomalies_only),
+    )
+    with _dashboard_cache_lock:
+        future = _dashboard_cache.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _dashboard_cache[key] = future
+            while len(_dashboard_cache) > DASHBOARD_CACHE_SIZE:
+                _dashboard_cache.popitem(last=False)
+        else:
+            _dashboard_cache.move_to_end(key)
+    if is_owner:
+        try:
+            future.set_result(build_dashboard(key[1], key[2], list(key[3]) or None, list(key[4]) or None, granularity, key[6]))
+        except Exception as e:
+            with _dashboard_cache_lock:
+                if _dashboard_cache.get(key) is future:
+                    del _dashboard_cache[key]
+            future.set_exception(e)
+    return list(future.result())
+
+def _run_prefetch(*args):
+    global _prefetch_pending
+    try:
+        get_dashboard(*args)
+    except Exception as e:
+        print(f"Prefetch failed: {e}")
+    finally:
+        with _dashboard_cache_lock:
+            _prefetch_pending -= 1
+
+def prefetch_dashboard(start_date, end_date, transation_type, type_filter, granularity, anomalies_only=False):
+    """Build a view in the background so a later request finds it warm"""
+    global _prefetch_pending
+    with _dashboard_cache_lock:
+        if _prefetch_pending >= PREFETCH_MAX_PENDING:
+            return
+        _prefetch_pending += 1
+    _prefetch_executor.submit(_run_prefetch, start_date, end_date, transation_type, type_filter, granularity, anomalies_only)
+
+def adjacent_periods(start_date, end_date):
+    """
+    The ranges just before and after the selection. Ranges starting on the 1st
+    step by whole months (month-to-date steps to the full previous/next month);
+    anything else steps by its own length in days.
+    """
+    if not start_date or not end_date:
+        return []
+    start = pd.Timestamp(_normalize_date(start_date))
+    end = pd.Timestamp(_normalize_date(end_date))
+    if end < start:
+        return []
+    one_day = pd.Timedelta(days=1)
+    if start.day == 1:
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        periods = [
+            (start - pd.DateOffset(months=months), start - one_day),
+            (start + pd.DateOffset(months=months), start + pd.DateOffset(months=2 * months) - one_day),
+        ]
+    else:
+        span = end - start + one_day
+        periods = [(start - span, start - one_day), (end + one_day, end + span)]
+    return [(s.strftime('%Y-%m-%d'), e.strftime('%Y-%m-%d')) for s, e in periods]
+
+def schedule_adjacent_prefetch(start_date, end_date, transation_type, type_filter, granularity, anomalies_only=False):
+    for period_start, period_end in adjacent_periods(start_date, end_date):
+        prefetch_dashboard(period_start, period_end, transation_type, type_filter, granularity, anomalies_only)
+
+def prewarm_default_view():
+    """Warm the view every session opens on: month to date, no filters, monthly trend"""
+    today = datetime.now().date()
+    prefetch_dashboard(today.replace(day=1).isoformat(), today.isoformat(), None, None, 'ME')
+
+@app.callback(
+    [Output('filter-transation_type', 'options'),
+     Output('filter-type', 'options'),
+     Output('filter-transation_type', 'disabled'),
+     Output('filter-type', 'disabled'),
+     Output('trend-granularity', 'disabled'),
+     Output('date-range', 'disabled'),
+     Output('card-highest-income', 'children'),
+     Output('card-highest-expense', 'children'),
+     Output('card-total', 'children'),
+     Output('card-profitloss', 'children'),
+     Output('card-frequent', 'children'),
+     Output('table-container', 'children'),
+     Output('trend-graph', 'figure'),
+     Output('projection-graph', 'figure'),
+     Output('all-data-graph', 'figure'),
+     Output('comparison-table', 'data'),
+     Output('comparison-summary', 'children'),
+     Output('modal-clear-db', 'is_open'),
+     Output('modal-duplicates', 'is_open'),
+     Output('duplicate-list', 'children'),
+     Output('upload-status', 'children')],
+    [Input('upload-data', 'contents'),
+     Input('trend-granularity', 'value'),
+     Input('filter-transation_type', 'value'),
+     Input('filter-type', 'value'),
+     Input('date-range', 'start_date'),
+     Input('date-range', 'end_date'),
+     Input('btn-clear-db', 'n_clicks'),
+     Input('btn-confirm-clear', 'n_clicks'),
+     Input('btn-cancel-clear', 'n_clicks'),
+     Input('btn-overwrite', 'n_clicks'),
+     Input('btn-cancel-import', 'n_clicks'),
+     Input('filter-anomalies', 'value')],
+    [State('upload-data', 'filename'),
+     State('modal-clear-db', 'is_open'),
+     State('modal-duplicates', 'is_open'),
+     State('upload-data', 'contents')]
+)
+def update_output(contents, granularity, transation_type, type_filter, start_date, end_date, btn_clear_db, btn_confirm_clear, btn_cancel_clear, btn_overwrite, btn_cancel_import, anomalies_only, filename, modal_clear_open, modal_dup_open, last_upload_contents):
+    import flask
+    from dash import callback_context
+    args = flask.request.args if flask.has_request_context() else {}
+    summary_card_style = SUMMARY_CARD_STYLE
+    ctx = callback_context
+    triggered = ctx.triggered[0]['prop_id'] if ctx.triggered else ''
+    # Handle clear DB modal logic
+    if triggered.startswith('btn-clear-db'):
+        return [dash.no_update] * 17 + [True, False, None, dash.no_update]
+    if triggered.startswith('btn-cancel-clear'):
+        return [dash.no_update] * 17 + [False, False, None, dash.no_update]
+    if triggered.startswith('btn-confirm-clear'):
+        clear_db()
+        return [[], [], True, True, True, True, None, None, None, None, None, None, go.Figure(), go.Figure(), go.Figure(), [], "No data in the selected range.", False, False, None, None]
+    # Handle duplicate modal logic
+    if triggered.startswith('btn-cancel-import'):
+        return [dash.no_update] * 17 + [False, False, None, dash.no_update]
+    if triggered.startswith('btn-overwrite'):
+        # Overwrite duplicates with last uploaded data
+        if last_upload_contents and filename:
+            df_upload, _ = parse_uploads(last_upload_contents, filename)
+            if df_upload is not None:
+                overwrite_duplicates(df_upload)
+                prewarm_default_view()
+        # After overwrite, fetch and show data
+        return get_dashboard(start_date, end_date, transation_type, type_filter, granularity, anomalies_only) + [False, False, None, dash.no_update]
+    status = dash.no_update
+    # If files are uploaded, merge them into one batch, check for duplicates and show modal if needed
+    if contents is not None and triggered.startswith('upload-data'):
+        df_upload, statuses = parse_uploads(contents, filename)
+        status = upload_status(statuses)
+        if df_upload is not None:
+            duplicate_rows = insert_transactions(df_upload)
+            prewarm_default_view()
+            if duplicate_rows:
+                # Show modal with duplicate details
+                dup_list = html.Ul([
+                    html.Li(', '.join(str(x) for x in row)) for row in duplicate_rows[:10]
+                ] + ([html.Li('...and more') if len(duplicate_rows) > 10 else None]))
+                return [dash.no_update] * 17 + [False, True, dup_list, status]
+    # Always read from DB for display, served from the warm cache where possible
+    outputs = get_dashboard(start_date, end_date, transation_type, type_filter, granularity, anomalies_only)
+    schedule_adjacent_prefetch(start_date, end_date, transation_type, type_filter, granularity, anomalies_only)
+    return outputs + [False, False, None, status]
+
+@app.callback(
+    Output('balance-graph', 'figure'),
+    # Chained off the trend figure so the balance redraws after uploads and clears too
+    [Input('trend-graph', 'figure')],
+    [State('date-range', 'start_date'),
+     State('date-range', 'end_date')]
+)
+def update_balance_graph(trend_figure, start_date, end_date):
+    curve = balance_curve(start_date, end_date)
+    if curve.empty:
+        return go.Figure()
+    balance_fig = px.line(
+        curve,
+        x='date',
+        y='balance',
+        line_shape='hv',
+        title='Net Balance Over Time',
+        labels={'date': 'Date', 'balance': 'Balance'}
+    )
+    balance_fig.update_traces(line_color='#198754')
+    balance_fig.update_layout(showlegend=False)
+    return balance_fig
+
+def period_label(period, granularity):
+    if granularity == 'D':
+        return period.strftime('%d %b %Y')
+    if granularity == 'ME':
+        return period.strftime('%b %Y')
+    if granularity == 'QE':
+        return f"Q{period.quarter} {period.year}"
+    return str(period.year)
+
+def _format_change(current, earlier):
+    if pd.isna(earlier) or earlier == 0:
+        return "-"
+    return f"{(current - earlier) / abs(earlier):+.1%}"
+
+def build_comparison_table(comparison, granularity):
+    """Rows and caption for the comparison card, from the latest period in the comparison"""
+    if comparison.empty:
+        return [], "No data in the selected range."
+    latest_period = comparison['period'].max()
+    latest = comparison[comparison['period'] == latest_period]
+    totals = latest[['total', 'previous_total', 'year_ago_total']].sum(min_count=1)
+    rows = []
+    for category, total, previous_total, year_ago_total in list(latest[['category', 'total', 'previous_total', 'year_ago_total']].itertuples(index=False)) + [('All', *totals)]:
+        rows.append({
+            'category': str(category).title() or '-',
+            'total': f"₹{total:,.2f}",
+            'previous_total': f"₹{previous_total:,.2f}" if pd.notna(previous_total) else "-",
+            'previous_change': _format_change(total, previous_total),
+            'year_ago_total': f"₹{year_ago_total:,.2f}" if pd.notna(year_ago_total) else "-",
+            'year_ago_change': _format_change(total, year_ago_total),
+        })
+    if latest['partial'].any():
+        return rows, f"{period_label(latest_period, granularity)}, days in range only, compared with the same days of the period before and of last year"
+    return rows, f"{period_label(latest_period, granularity)} compared with the period before and the same period last year"
+
+@app.callback(
+    [Output('search-table', 'data'),
+     Output('search-table', 'page_count'),
+     Output('search-table', 'page_current'),
+     Output('search-summary', 'children')],
+    [Input('search-text', 'value'),
+     Input('search-table', 'page_current'),
+     Input('search-table', 'page_size'),
+     Input('filter-transation_type', 'value'),
+     Input('filter-type', 'value'),
+     Input('date-range', 'start_date'),
+     Input('date-range', 'end_date'),
+     Input('filter-anomalies', 'value')]
+)
+def update_search_results(search_text, page_current, page_size, transation_type, type_filter, start_date, end_date, anomalies_only):
+    if not search_text or not search_text.strip():
+        return [], 0, 0, ""
+    triggered = callback_context.triggered[0]['prop_id'] if callback_context.triggered else ''
+    # A new query or filter starts again from the first page
+    if not triggered.startswith('search-table.page_current'):
+        page_current = 0
+    page_current = page_current or 0
+    df, total = search_transactions(search_text, start_date, end_date, transation_type, type_filter, bool(anomalies_only), page_current, page_size)
+    if total > SEARCH_RANK_LIMIT:
+        # Uncounted beyond the limit; an open-ended page count keeps "next" enabled
+        return df.to_dict('records'), None, page_current, f"{SEARCH_RANK_LIMIT:,}+ matching transactions, most recently imported first"
+    page_count = -(-total // page_size)
+    return df.to_dict('records'), page_count, page_current, f"{total:,} matching transactions"
 
 @app.callback(
     Output("download-template", "data"),
@@ -863,6 +2072,301 @@ def download_template(n_clicks):
     })
     return dcc.send_data_frame(template_df.to_excel, "financial_template.xlsx", index=False)
 
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+# Excel's hard limit per sheet, header row included
+XLSX_MAX_ROWS = 1048576
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose buffered bytes can be handed off and discarded"""
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+def _export_csv(chunks):
+    yield ','.join(TRANSACTION_COLUMNS).encode('utf-8') + b'\n'
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=False).encode('utf-8')
+
+def _export_parquet(batches):
+    import pyarrow.parquet as pq
+    sink = _DrainableSink()
+    # One row group per record batch, so only the current batch is ever held in memory
+    with pq.ParquetWriter(sink, arrow_schema()) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+def _export_xlsx(chunks):
+    from openpyxl import Workbook
+    # Write-only workbooks spool rows to disk instead of building cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = None
+    rows_in_sheet = XLSX_MAX_ROWS
+    for chunk in chunks:
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+            if rows_in_sheet >= XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f'transactions_{len(workbook.worksheets) + 1}')
+                sheet.append(TRANSACTION_COLUMNS)
+                rows_in_sheet = 1
+            sheet.append(list(row))
+            rows_in_sheet += 1
+    if sheet is None:
+        workbook.create_sheet('transactions_1').append(TRANSACTION_COLUMNS)
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            data = spool.read(1 << 16)
+            if not data:
+                break
+            yield data
+
+def _gzip_stream(stream):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for data in stream:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_url(fmt, start_date=None, end_date=None, transation_type=None, type_filter=None, anomalies_only=False, gzip=False):
+    """Link to the export endpoint for the given filter selection"""
+    params = {'start_date': start_date or '', 'end_date': end_date or '', 'transation_type': transation_type or [], 'type': type_filter or []}
+    if anomalies_only:
+        params['anomalies_only'] = '1'
+    if gzip:
+        params['gzip'] = '1'
+    return f"/export/transactions.{fmt}?{urlencode(params, doseq=True)}"
+
+@app.server.route('/export/transactions.<fmt>')
+def export_transactions(fmt):
+    """
+    Stream the filtered transactions as CSV, XLSX or Parquet.
+    Rows are pulled from SQLite in chunks so memory stays flat regardless of table size.
+    """
+    import flask
+    if fmt not in EXPORT_FORMATS:
+        flask.abort(404)
+    args = flask.request.args
+    chunks = iter_transactions(
+        args.get('start_date') or None,
+        args.get('end_date') or None,
+        args.getlist('transation_type') or None,
+        args.getlist('type') or None,
+        args.get('anomalies_only') == '1',
+        arrow=fmt == 'parquet',
+    )
+    if fmt == 'csv':
+        stream = _export_csv(chunks)
+    elif fmt == 'parquet':
+        stream = _export_parquet(chunks)
+    else:
+        stream = _export_xlsx(chunks)
+    filename = f"transactions.{fmt}"
+    mimetype = EXPORT_FORMATS[fmt]
+    if args.get('gzip') == '1':
+        stream = _gzip_stream(stream)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    return flask.Response(
+        flask.stream_with_context(stream),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.callback(
+    [Output('export-csv', 'href'),
+     Output('export-csv-gz', 'href'),
+     Output('export-xlsx', 'href'),
+     Output('export-parquet', 'href')],
+    [Input('date-range', 'start_date'),
+     Input('date-range', 'end_date'),
+     Input('filter-transation_type', 'value'),
+     Input('filter-type', 'value'),
+     Input('filter-anomalies', 'value')]
+)
+def update_export_links(start_date, end_date, transation_type, type_filter, anomalies_only):
+    return [
+        export_url('csv', start_date, end_date, transation_type, type_filter, anomalies_only),
+        export_url('csv', start_date, end_date, transation_type, type_filter, anomalies_only, gzip=True),
+        export_url('xlsx', start_date, end_date, transation_type, type_filter, anomalies_only),
+        export_url('parquet', start_date, end_date, transation_type, type_filter, anomalies_only),
+    ]
+
+# Read API for other services. Every response carries the data version it was built
+# from; ETags derive from that version, so unchanged data costs a 304 and no rebuild.
+API_CACHE_SIZE = int(os.environ.get('API_CACHE_SIZE', 64))
+API_DEFAULT_LIMIT = 1000
+API_MAX_LIMIT = 10000
+_api_cache = OrderedDict()
+_api_cache_lock = threading.Lock()
+
+def _frame_records(df):
+    """JSON-ready rows: ISO dates, label strings, None for missing values"""
+    records = df.astype(object)
+    if 'date' in df:
+        records['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    return records.where(df.notna(), None).to_dict('records')
+
+def _api_filters(args):
+    return _filter_clause(
+        args.get('start_date') or None,
+        args.get('end_date') or None,
+        args.getlist('transation_type') or None,
+        args.getlist('type') or None,
+        args.get('anomalies_only') == '1',
+    )
+
+def _api_limit(args):
+    return max(1, min(args.get('limit', API_DEFAULT_LIMIT, type=int), API_MAX_LIMIT))
+
+def _json_response(build):
+    """
+    Serve build(cursor, version) as JSON for the current request. The data version and
+    the payload are read in one transaction, so the ETag always matches the body.
+    """
+    import flask
+    request = flask.request
+    conn = get_read_connection()
+    try:
+        conn.execute('BEGIN')
+        c = conn.cursor()
+        c.execute('SELECT version FROM data_version WHERE id = 1')
+        version = c.fetchone()[0]
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), version)
+        etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        if etag in request.if_none_match:
+            response = flask.Response(status=304)
+        else:
+            with _api_cache_lock:
+                body = _api_cache.get(key)
+                if body is not None:
+                    _api_cache.move_to_end(key)
+            if body is None:
+                body = json.dumps(build(c, version)).encode('utf-8')
+                with _api_cache_lock:
+                    _api_cache[key] = body
+                    while len(_api_cache) > API_CACHE_SIZE:
+                        _api_cache.popitem(last=False)
+            response = flask.Response(body, mimetype='application/json')
+    finally:
+        conn.close()
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate it with If-None-Match
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.server.route('/api/transactions')
+def api_transactions():
+    """
+    Filtered transactions ordered by id, a page at a time: pass the returned
+    next_after back as after= until it comes back null.
+    """
+    import flask
+    args = flask.request.args
+    after = args.get('after', 0, type=int)
+    limit = _api_limit(args)
+    clause, params = _api_filters(args)
+    def build(c, version):
+        c.execute(f'SELECT transactions.id, {_select_list(FETCH_COLUMNS)} FROM transactions WHERE id > ?' + clause + ' ORDER BY id LIMIT ?', [after] + params + [limit + 1])
+        rows = c.fetchall()
+        df = _rows_to_frame(c, rows[:limit], ['id'] + FETCH_COLUMNS)
+        return {
+            'version': version,
+            'transactions': _frame_records(df),
+            'next_after': int(df['id'].iloc[-1]) if len(rows) > limit else None,
+        }
+    return _json_response(build)
+
+@app.server.route('/api/changes')
+def api_changes():
+    """
+    Inserts and deletes recorded after data version since=N, oldest first. A page that
+    ends mid-way sets has_more; continue with the returned cursor. A 'clear' entry means
+    everything before it is gone and the client should drop its copy.
+    """
+    import flask
+    args = flask.request.args
+    limit = _api_limit(args)
+    def build(c, version):
+        if 'cursor' in args:
+            after_seq = args.get('cursor', 0, type=int)
+        else:
+            c.execute('SELECT COALESCE(MAX(seq), 0) FROM changes WHERE version <= ?', (args.get('since', 0, type=int),))
+            after_seq = c.fetchone()[0]
+        c.execute(f'''SELECT changes.seq, changes.version, changes.op, changes.transaction_id, transactions.id IS NOT NULL, {_select_list(FETCH_COLUMNS)}
+            FROM changes LEFT JOIN transactions ON changes.op = 'insert' AND transactions.id = changes.transaction_id
+            WHERE changes.seq > ? ORDER BY changes.seq LIMIT ?''', (after_seq, limit + 1))
+        rows = c.fetchall()
+        df = _rows_to_frame(c, rows[:limit], ['seq', 'version', 'op', 'id', 'present'] + FETCH_COLUMNS)
+        transactions = _frame_records(df[FETCH_COLUMNS])
+        changes = [
+            {
+                'seq': seq,
+                'version': change_version,
+                'op': op,
+                'id': transaction_id,
+                # Inserts whose row was deleted later carry no body; the delete follows
+                'transaction': transaction if present else None,
+            }
+            for seq, change_version, op, transaction_id, present, transaction in zip(df['seq'], df['version'], df['op'], df['id'], df['present'], transactions)
+        ]
+        return {
+            'version': version,
+            'changes': changes,
+            'cursor': changes[-1]['seq'] if changes else after_seq,
+            'has_more': len(rows) > limit,
+        }
+    return _json_response(build)
+
+@app.server.route('/api/aggregates')
+def api_aggregates():
+    """Totals and counts per period (granularity=D|ME|QE|YE), optionally split by a label column"""
+    import flask
+    args = flask.request.args
+    granularity = args.get('granularity', 'ME')
+    group_by = args.get('group_by') or None
+    if granularity not in PERIOD_START_SQL or (group_by and group_by not in CATEGORICAL_COLUMNS):
+        flask.abort(400)
+    clause, params = _api_filters(args)
+    period = PERIOD_START_SQL[granularity].format(column='transactions.date')
+    group_select = ', lookup.name' if group_by else ''
+    group_join = f' LEFT JOIN lookup_{group_by} lookup ON lookup.id = transactions.{group_by}_id' if group_by else ''
+    def build(c, version):
+        c.execute(f'''SELECT {period}{group_select}, SUM(transactions.amount), COUNT(*)
+            FROM transactions{group_join} WHERE transactions.date IS NOT NULL''' + clause + ' GROUP BY 1' + (', 2' if group_by else '') + ' ORDER BY 1', params)
+        buckets = []
+        for row in c.fetchall():
+            bucket = {'period_start': row[0]}
+            if group_by:
+                bucket[group_by] = row[1]
+            bucket['total'] = row[-2]
+            bucket['count'] = row[-1]
+            buckets.append(bucket)
+        return {'version': version, 'granularity': granularity, 'group_by': group_by, 'buckets': buckets}
+    return _json_response(build)
+
 # Update the pie chart callback to control modal open/close
 @app.callback(
     Output('summary-pie', 'figure'),
@@ -881,13 +2385,13 @@ def show_summary_pie(n_income, n_expense, n_total, n_profit, n_freq, contents, i
     ctx = callback_context
     if not ctx.triggered or contents is None:
         return go.Figure(), False
-    df = parse_contents(contents, filename)
-    if df is None or not set(['transation_type', 'amount', 'type', 'description', 'date', 'title']).issubset(df.columns):
-        return go.Figure(), False
-    df['date'] = pd.to_datetime(df['date'])
     btn_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    # Close modal if backdrop or close button is clicked
-    if btn_id == 'summary-pie-modal':
+    # A new upload or closing the modal (backdrop or close button) only resets it;
+    # decide that before parsing, so a multi-file batch isn't unpacked for nothing
+    if btn_id in ('upload-data', 'summary-pie-modal'):
+        return go.Figure(), False
+    df, _ = parse_uploads(contents, filename)
+    if df is None:
         return go.Figure(), False
     if btn_id == 'card-highest-income':
         pie_df = df[df['transation_type'] == 'income']
@@ -970,6 +2474,8 @@ def handle_email_modal(open_clicks, send_clicks, close_clicks, is_open, smtp_ser
     
     return is_open, ""
 
+prewarm_default_view()
+
 if __name__ == '__main__':
     app.run(debug=True)
 
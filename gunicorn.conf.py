@@ -0,0 +1,14 @@
+"""
+Gunicorn settings for the dashboard.
+
+Threaded (gthread) workers let a single worker serve several dashboard
+callbacks at once. The app opens SQLite in WAL mode and takes write locks
+with BEGIN IMMEDIATE, so threads and workers can share the database file.
+"""
+import os
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('WEB_THREADS', 4))
+# Large Excel imports can take a while on small dynos
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
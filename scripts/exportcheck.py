@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Export memory check.
+
+Fills a scratch copy of the database with a multi-million-row table, streams every
+export format through the real /export route and samples the process RSS while the
+response is consumed. Exits non-zero if RSS grows by more than --max-growth-mb for any
+format, i.e. if an export starts buffering the table instead of streaming it.
+
+The real database is never touched:
+
+    python scripts/exportcheck.py --rows 2000000
+    python scripts/exportcheck.py --rows 500000 --formats csv parquet
+
+Keep the __main__ guard below: the upload pool's fork server re-runs the main script.
+"""
+import argparse
+import sqlite3
+import sys
+import time
+
+from scratch import scratch_app
+
+FORMATS = {
+    'csv': 'csv',
+    'csv.gz': 'csv?gzip=1',
+    'parquet': 'parquet',
+    'xlsx': 'xlsx',
+}
+
+
+def rss_mb():
+    """Current resident set size; falls back to the peak where /proc is unavailable"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def fill(app, rows):
+    """Seed the lookup tables through the app, then bulk-generate rows in SQL"""
+    import pandas as pd
+    app.clear_db()
+    app.insert_transactions(pd.DataFrame({
+        'transation_type': ['income', 'expense'],
+        'amount': [1.0, 2.0],
+        'type': ['one_time', 'recurring'],
+        'description': ['seed income', 'seed expense'],
+        'date': pd.to_datetime(['2020-01-01', '2020-01-02']),
+        'title': ['salary', 'rent'],
+    }))
+    conn = sqlite3.connect(app.DB_PATH)
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO transactions (transation_type_id, amount, type_id, description, date, title_id, fingerprint)
+        SELECT 1 + i % 2, round(i * 0.37 % 5000, 2), 1 + i % 2, 'generated row ' || i,
+            date('2020-01-01', '+' || (i % 2000) || ' days'), 1 + i % 2, -i
+        FROM n''', (rows,))
+    conn.execute('UPDATE data_version SET version = version + 1 WHERE id = 1')
+    conn.commit()
+    conn.close()
+
+
+def check(client, path):
+    before = rss_mb()
+    peak = before
+    size = 0
+    started = time.perf_counter()
+    response = client.get(path, buffered=False)
+    for part in response.response:
+        size += len(part)
+        peak = max(peak, rss_mb())
+    response.close()
+    return response.status_code, size, before, peak, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000000, help='rows to generate')
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--max-growth-mb', type=float, default=150, help='allowed RSS growth while streaming one export')
+    args = parser.parse_args()
+
+    with scratch_app('exportcheck-') as app:
+        started = time.perf_counter()
+        fill(app, args.rows)
+        print(f"generated {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+        client = app.app.server.test_client()
+        failed = False
+        print(f"{'format':<10}{'status':>8}{'MB out':>10}{'RSS before':>12}{'RSS peak':>10}{'growth':>9}{'secs':>8}")
+        for name in args.formats:
+            status, size, before, peak, seconds = check(client, '/export/transactions.' + FORMATS[name])
+            growth = peak - before
+            ok = status == 200 and growth <= args.max_growth_mb
+            failed |= not ok
+            print(f"{name:<10}{status:>8}{size / 1e6:>10.1f}{before:>12.0f}{peak:>10.0f}{growth:>9.0f}{seconds:>8.1f}{'' if ok else '  FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Change feed continuity check.
+
+Keeps a replica of the transactions table in sync through /api/changes, paging with a
+small limit, while the app imports, overwrites the newest row and clears the database.
+After every step the replica must equal /api/transactions, the cursor must only move
+forward, and no deleted id may come back. Exits non-zero on the first mismatch.
+
+Runs against a scratch database, so the real one is never touched:
+
+    python scripts/feedcheck.py
+
+Keep the __main__ guard below: the upload pool's fork server re-runs the main script.
+"""
+import sys
+
+import pandas as pd
+
+from scratch import scratch_app
+
+PAGE_LIMIT = 2
+
+
+def ledger(start, count, title):
+    return pd.DataFrame({
+        'transation_type': ['income', 'expense'] * (count // 2) + ['income'] * (count % 2),
+        'amount': [100.0 + start + i for i in range(count)],
+        'type': 'one_time',
+        'description': [f'{title} {start + i}' for i in range(count)],
+        'date': pd.date_range('2024-01-01', periods=count, freq='D') + pd.Timedelta(days=start),
+        'title': title,
+    })
+
+
+class Replica:
+    def __init__(self, client):
+        self.client = client
+        self.rows = {}
+        self.cursor = None
+        self.deleted = set()
+
+    def sync(self):
+        """Apply every change after the cursor; returns the ops seen"""
+        ops = []
+        while True:
+            query = f'limit={PAGE_LIMIT}&' + (f'cursor={self.cursor}' if self.cursor is not None else 'since=0')
+            page = self.client.get('/api/changes?' + query).get_json()
+            for change in page['changes']:
+                ops.append(change['op'])
+                if change['op'] == 'clear':
+                    self.deleted.update(self.rows)
+                    self.rows.clear()
+                elif change['op'] == 'delete':
+                    self.rows.pop(change['id'], None)
+                    self.deleted.add(change['id'])
+                elif change['transaction'] is not None:
+                    if change['id'] in self.deleted:
+                        raise AssertionError(f"id {change['id']} was deleted and then reused")
+                    self.rows[change['id']] = change['transaction']
+            if self.cursor is not None and page['cursor'] < self.cursor:
+                raise AssertionError(f"cursor went back from {self.cursor} to {page['cursor']}")
+            self.cursor = page['cursor']
+            if not page['has_more']:
+                return ops
+
+
+def server_rows(client):
+    rows = {}
+    after = 0
+    while after is not None:
+        page = client.get(f'/api/transactions?limit=1000&after={after}').get_json()
+        for row in page['transactions']:
+            rows[row.pop('id')] = row
+        after = page['next_after']
+    return rows
+
+
+def main():
+    with scratch_app('feedcheck-') as app:
+        client = app.app.server.test_client()
+        replica = Replica(client)
+        first = ledger(0, 5, 'salary')
+        steps = [
+            ('import', lambda: app.insert_transactions(first)),
+            ('overwrite newest', lambda: app.overwrite_duplicates(first.tail(1))),
+            ('import more', lambda: app.insert_transactions(ledger(5, 3, 'rent'))),
+            ('clear and import', lambda: (app.clear_db(), app.insert_transactions(ledger(20, 3, 'fees')))),
+            ('overwrite newest', lambda: app.overwrite_duplicates(ledger(20, 3, 'fees').tail(1))),
+        ]
+        try:
+            for name, step in steps:
+                step()
+                ops = replica.sync()
+                expected = server_rows(client)
+                ok = replica.rows == expected
+                print(f"{name:<18} ops {','.join(ops) or '-':<48} cursor {replica.cursor:>3}  rows {len(expected):>2}  {'ok' if ok else 'MISMATCH'}")
+                if not ok:
+                    sys.exit(1)
+            fresh = Replica(client)
+            fresh.sync()
+            if fresh.rows != server_rows(client):
+                print('replay from since=0 does not match')
+                sys.exit(1)
+            print('replay from since=0 ok')
+        except AssertionError as error:
+            print(f'FAIL: {error}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Fetch layer benchmark.
+
+Fills a scratch database with --rows generated transactions and times each way of
+reading them back, reporting the best wall time and the peak RSS growth of the run:
+
+- row tuples: fetchall, DataFrame, to_datetime, as the app read rows before the typed
+  fetch layer (labels joined from the lookup tables)
+- fetch_transactions(): typed frame with every fetchable column
+- fetch_transactions(columns=['date', 'amount']): projected typed frame
+- iter_transactions(arrow=True): Arrow record batches, consumed and dropped
+
+Every run happens in a forked child, so one path's freed memory does not hide the next
+one's peak. Peak RSS is read from /proc, so this runs on Linux only:
+
+    python scripts/fetchbench.py
+    python scripts/fetchbench.py --rows 200000 --repeat 5
+
+Keep the __main__ guard below: the upload pool's fork server re-runs the main script.
+"""
+import argparse
+import multiprocessing
+import sqlite3
+import time
+
+import pandas as pd
+
+from exportcheck import fill
+from scratch import scratch_app
+
+ROW_TUPLES_SQL = '''
+    SELECT transation_type.name, t.amount, type.name, t.description, t.date, title.name
+    FROM transactions t
+    LEFT JOIN lookup_transation_type transation_type ON transation_type.id = t.transation_type_id
+    LEFT JOIN lookup_type type ON type.id = t.type_id
+    LEFT JOIN lookup_title title ON title.id = t.title_id'''
+
+
+def memory_mb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise SystemExit(f'{field} not found in /proc/self/status')
+
+
+def row_tuples(app):
+    conn = sqlite3.connect(app.DB_PATH)
+    rows = conn.execute(ROW_TUPLES_SQL).fetchall()
+    conn.close()
+    df = pd.DataFrame(rows, columns=app.TRANSACTION_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    return len(df)
+
+
+def typed_frame(app):
+    return len(app.fetch_transactions())
+
+
+def projected_frame(app):
+    return len(app.fetch_transactions(columns=['date', 'amount']))
+
+
+def arrow_batches(app):
+    return sum(batch.num_rows for batch in app.iter_transactions(arrow=True))
+
+
+PATHS = [
+    ('row tuples', row_tuples),
+    ('fetch_transactions()', typed_frame),
+    ('fetch date, amount', projected_frame),
+    ('iter arrow batches', arrow_batches),
+]
+
+
+def measure(app, func, results):
+    """Child process: run func once and report rows, seconds and RSS growth"""
+    before = memory_mb('VmRSS')
+    started = time.perf_counter()
+    rows = func(app)
+    seconds = time.perf_counter() - started
+    results.send((rows, seconds, memory_mb('VmHWM') - before))
+
+
+def run(context, app, func):
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=measure, args=(app, func, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='rows to generate')
+    parser.add_argument('--repeat', type=int, default=3, help='report the best of this many runs')
+    args = parser.parse_args()
+
+    # Forked children see the imported app and the filled database without redoing either
+    context = multiprocessing.get_context('fork')
+    with scratch_app('fetchbench-') as app:
+        started = time.perf_counter()
+        fill(app, args.rows)
+        print(f"generated {args.rows:,} rows in {time.perf_counter() - started:.1f}s")
+        print(f"{'path':<22}{'rows':>11}{'secs':>8}{'peak MB':>9}")
+        for name, func in PATHS:
+            runs = [run(context, app, func) for _ in range(args.repeat)]
+            rows = runs[0][0]
+            seconds = min(run_seconds for _, run_seconds, _ in runs)
+            peak = max(run_peak for _, _, run_peak in runs)
+            print(f"{name:<22}{rows:>11,}{seconds:>8.2f}{peak:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Local load test for the dashboard.
+
+Simulates concurrent users sending the same Dash callback requests the browser
+sends (/_dash-update-component): filter and date changes, pie-card clicks,
+searches and Excel uploads. It then reports latency percentiles and throughput
+per callback.
+
+Only localhost targets are accepted. With --serve, the harness starts its own
+gunicorn (gthread) server on a scratch copy of the database, so a run never
+touches real data:
+
+    python scripts/loadtest.py --serve --users 20 --duration 60
+    python scripts/loadtest.py --url http://127.0.0.1:8050 --users 10
+
+Keep the __main__ guard below: the upload pool's fork server re-runs the main script.
+"""
+import argparse
+import base64
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from scratch import ROOT, scratch_dir
+
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+# Relative weight of each user action
+SCENARIOS = {
+    'filter-change': 60,
+    'pie-click': 15,
+    'search': 15,
+    'upload': 10,
+}
+GRANULARITIES = ['D', 'ME', 'QE', 'YE']
+TRANSACTION_TYPES = ['income', 'expense', 'investment']
+SEARCH_TERMS = ['rent', 'salary', 'developer', 'website', 'grocer', 'test']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def excel_upload(rows=20):
+    """A small statement file as the upload component would send it"""
+    today = date.today()
+    df = pd.DataFrame({
+        'transation_type': [random.choice(TRANSACTION_TYPES) for _ in range(rows)],
+        'amount': [round(random.uniform(10, 5000), 2) for _ in range(rows)],
+        'type': [random.choice(['recurring', 'one_time']) for _ in range(rows)],
+        'description': [f"load test {random.getrandbits(32):x}" for _ in range(rows)],
+        'date': [(today - timedelta(days=random.randint(0, 365))).isoformat() for _ in range(rows)],
+        'title': [random.choice(['rent', 'salary', 'grocer', 'utilities']) for _ in range(rows)],
+    })
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return 'data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,' + encoded
+
+
+class DashClient:
+    """Keep-alive HTTP client that speaks the Dash callback protocol"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.conn = http.client.HTTPConnection(host, port, timeout=120)
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        payload = json.dumps(body) if body is not None else None
+        for attempt in range(2):
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError, socket.timeout):
+                self.conn.close()
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+                if attempt:
+                    raise
+
+    def callback(self, dependency, inputs, state=None, changed=None):
+        def fill(specs, values):
+            return [
+                {'id': spec['id'], 'property': spec['property'], 'value': values.get(f"{spec['id']}.{spec['property']}")}
+                for spec in specs
+            ]
+        outputs = [
+            {'id': part.rsplit('.', 1)[0], 'property': part.rsplit('.', 1)[1]}
+            for part in dependency['output'].strip('.').split('...')
+        ]
+        body = {
+            'output': dependency['output'],
+            'outputs': outputs if len(outputs) > 1 else outputs[0],
+            'inputs': fill(dependency['inputs'], inputs),
+            'state': fill(dependency.get('state', []), state or {}),
+            'changedPropIds': changed or [],
+        }
+        return self.request('POST', '/_dash-update-component', body)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+
+def find_dependency(dependencies, output_fragment):
+    return next(dep for dep in dependencies if output_fragment in dep['output'])
+
+
+def random_filters():
+    end = date.today() - timedelta(days=random.randint(0, 365))
+    start = (end - timedelta(days=random.choice([7, 30, 90, 365]))).replace(day=1)
+    return {
+        'trend-granularity.value': random.choice(GRANULARITIES),
+        'filter-transation_type.value': random.sample(TRANSACTION_TYPES, random.randint(0, 2)) or None,
+        'filter-type.value': None,
+        'filter-anomalies.value': random.random() < 0.1,
+        'date-range.start_date': start.isoformat(),
+        'date-range.end_date': end.isoformat(),
+    }
+
+
+def run_user(client, dependencies, recorder, stop_at, uploads):
+    main = find_dependency(dependencies, 'trend-graph.figure')
+    pie = find_dependency(dependencies, 'summary-pie.figure')
+    search = find_dependency(dependencies, 'search-table.data')
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[name] for name in names]
+    filters = random_filters()
+    while time.perf_counter() < stop_at:
+        scenario = random.choices(names, weights)[0]
+        upload = random.choice(uploads)
+        started = time.perf_counter()
+        if scenario == 'filter-change':
+            filters = random_filters()
+            status, _ = client.callback(main, filters, changed=['date-range.start_date'])
+        elif scenario == 'upload':
+            # Two statements at once, so the parsing worker pool is exercised too
+            files = random.sample(uploads, 2)
+            inputs = dict(filters, **{'upload-data.contents': files})
+            state = {'upload-data.filename': ['statement-1.xlsx', 'statement-2.xlsx'], 'upload-data.contents': files}
+            status, _ = client.callback(main, inputs, state, changed=['upload-data.contents'])
+        elif scenario == 'pie-click':
+            card = random.choice(['card-highest-income', 'card-highest-expense', 'card-total', 'card-profitloss', 'card-frequent'])
+            inputs = {f'{card}.n_clicks': 1, 'upload-data.contents': [upload], 'summary-pie-modal.is_open': False}
+            status, _ = client.callback(pie, inputs, {'upload-data.filename': ['statement.xlsx']}, changed=[f'{card}.n_clicks'])
+        else:
+            inputs = dict(filters, **{'search-text.value': random.choice(SEARCH_TERMS), 'search-table.page_current': 0, 'search-table.page_size': 10})
+            status, _ = client.callback(search, inputs, changed=['search-text.value'])
+        recorder.record(scenario, time.perf_counter() - started, status == 200)
+
+
+def report(recorder, elapsed):
+    print(f"\n{'callback':<15}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    total = 0
+    for name in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[name])
+        total += len(values)
+        print(f"{name:<15}{len(values):>10}{recorder.errors[name]:>8}{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}{percentile(values, 99) * 1000:>10.1f}")
+    print(f"{'total':<15}{total:>10}{sum(recorder.errors.values()):>8}{total / elapsed:>9.1f}")
+
+
+def wait_for_server(host, port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, _ = DashClient(host, port).request('GET', '/_dash-dependencies')
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Server on {host}:{port} did not come up within {timeout}s")
+
+
+def start_server(port, workers, threads, directory):
+    db_copy = os.path.join(directory, 'transactions.db')
+    source_db = os.path.join(ROOT, 'transactions.db')
+    if os.path.exists(source_db):
+        shutil.copy(source_db, db_copy)
+    env = dict(os.environ, TRANSACTIONS_DB=db_copy, WEB_CONCURRENCY=str(workers), WEB_THREADS=str(threads))
+    command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:server']
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help='dashboard to test (localhost only)')
+    parser.add_argument('--users', type=int, default=10, help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--serve', action='store_true', help='start a gunicorn server on a scratch database copy')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers with --serve')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker with --serve')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    if url.hostname not in LOCAL_HOSTS:
+        parser.error('the load test only runs against localhost')
+    host, port = url.hostname, url.port or 80
+    random.seed(args.seed)
+
+    server = None
+    with scratch_dir('loadtest-') as directory:
+        try:
+            if args.serve:
+                server = start_server(port, args.workers, args.threads, directory)
+            wait_for_server(host, port)
+            status, body = DashClient(host, port).request('GET', '/_dash-dependencies')
+            dependencies = json.loads(body)
+            uploads = [excel_upload() for _ in range(5)]
+            recorder = Recorder()
+            stop_at = time.perf_counter() + args.duration
+            started = time.perf_counter()
+            users = [
+                threading.Thread(target=run_user, args=(DashClient(host, port), dependencies, recorder, stop_at, uploads), daemon=True)
+                for _ in range(args.users)
+            ]
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            report(recorder, time.perf_counter() - started)
+        finally:
+            if server is not None:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Recurring-schedule detection benchmark.
+
+Generates two synthetic ledgers with a fixed seed and times compute_recurrence_keys and
+detect_recurring on them:
+
+- noisy: rows spread over --groups payees with random dates and ~0.5% amount jitter,
+  so most groups are irregular and few schedules are found
+- monthly: --rows / 100 subscriptions with 100 monthly payments each, all of which
+  must be detected
+
+Exits non-zero if the monthly ledger does not yield every schedule. Importing the app
+uses a scratch database, so the real one is never touched:
+
+    python scripts/recurringbench.py
+    python scripts/recurringbench.py --rows 200000 --repeat 5
+
+Keep the __main__ guard below: the upload pool's fork server re-runs the main script.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from scratch import scratch_app
+
+
+def noisy_ledger(rows, groups, seed):
+    rng = np.random.default_rng(seed)
+    group = rng.integers(0, groups, rows)
+    return pd.DataFrame({
+        'transation_type': np.where(group % 3 == 0, 'income', 'expense'),
+        'title': pd.Series(group).map(lambda v: f'payee {v}'),
+        'description': pd.Series(rng.integers(0, 10**6, rows)).map(lambda v: f'ref {v}'),
+        'amount': (100 + group % 500) * (1 + rng.normal(0, 0.005, rows)),
+        'date': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D'),
+    })
+
+
+def monthly_ledger(rows):
+    schedules = max(1, rows // 100)
+    return pd.DataFrame({
+        'transation_type': 'expense',
+        'title': np.repeat([f'subscription {i}' for i in range(schedules)], 100),
+        'description': 'subscription',
+        'amount': np.repeat(np.arange(schedules) + 10.0, 100),
+        'date': np.tile(pd.date_range('2010-01-15', periods=100, freq='MS'), schedules),
+    }), schedules
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='rows per ledger')
+    parser.add_argument('--groups', type=int, default=20000, help='payees in the noisy ledger')
+    parser.add_argument('--repeat', type=int, default=3, help='report the best of this many runs')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with scratch_app('recurringbench-') as app:
+        noisy = noisy_ledger(args.rows, args.groups, args.seed)
+        seconds, keys = best_of(args.repeat, app.compute_recurrence_keys, noisy)
+        print(f"compute_recurrence_keys  {len(noisy):>9,} rows  {seconds:6.2f}s")
+        noisy['recurrence_key'] = keys
+        seconds, schedules = best_of(args.repeat, app.detect_recurring, noisy)
+        print(f"detect_recurring noisy   {len(noisy):>9,} rows  {seconds:6.2f}s  {len(schedules):,} schedules")
+
+        monthly, expected = monthly_ledger(args.rows)
+        monthly['recurrence_key'] = app.compute_recurrence_keys(monthly)
+        seconds, schedules = best_of(args.repeat, app.detect_recurring, monthly)
+        found = int((schedules['period'] == 'monthly').sum())
+        print(f"detect_recurring monthly {len(monthly):>9,} rows  {seconds:6.2f}s  {found:,} of {expected:,} monthly schedules")
+    sys.exit(0 if found == expected else 1)
+
+
+if __name__ == '__main__':
+    main()
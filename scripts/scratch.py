@@ -0,0 +1,36 @@
+"""
+Scratch setup shared by the scripts in this directory.
+
+Each script runs the app against a throwaway database, so the real one is never touched.
+Scripts that use this must keep their `if __name__ == '__main__'` guard: the upload pool's
+fork server prepares its workers by re-running the main script.
+"""
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextlib.contextmanager
+def scratch_dir(prefix):
+    """A temporary directory, removed on exit"""
+    path = tempfile.mkdtemp(prefix=prefix)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def scratch_app(prefix):
+    """Import the app on an empty database in a temporary directory and yield the module"""
+    with scratch_dir(prefix) as path:
+        os.environ['TRANSACTIONS_DB'] = os.path.join(path, 'transactions.db')
+        os.environ.pop('READ_SNAPSHOTS', None)
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        import app
+        yield app
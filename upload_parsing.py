@@ -0,0 +1,28 @@
+"""
+Spreadsheet parsing for uploads. Upload worker processes import only this module, so it
+must stay free of import-time side effects: no database setup, no Dash app.
+"""
+import io
+
+import pandas as pd
+
+
+def parse_spreadsheet(filename, data, required_columns):
+    """
+    Read and validate one uploaded spreadsheet. Runs in a worker process, so it returns
+    plain values: (filename, DataFrame or None, error message or None).
+    """
+    if 'xls' not in filename.lower():
+        return filename, None, "not an Excel file"
+    try:
+        df = pd.read_excel(io.BytesIO(data))
+    except Exception as e:
+        return filename, None, f"could not be read ({e})"
+    missing = [col for col in required_columns if col not in df.columns]
+    if missing:
+        return filename, None, f"missing columns: {', '.join(missing)}"
+    try:
+        df['date'] = pd.to_datetime(df['date'])
+    except (ValueError, TypeError) as e:
+        return filename, None, f"unreadable dates ({e})"
+    return filename, df, None